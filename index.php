@@ -126,6 +126,27 @@
 
         let intervalId = null;
         let downloadIntervalId = null;
+        let spiderSince = 0;
+        let downloadSince = 0;
+
+        function startWatch(update) {
+            const watch = { active: true };
+            (async () => {
+                while (watch.active) {
+                    const started = Date.now();
+                    await update(true);
+                    const elapsed = Date.now() - started;
+                    if (watch.active && elapsed < 1000) {
+                        await new Promise(resolve => setTimeout(resolve, 1000 - elapsed));
+                    }
+                }
+            })();
+            return watch;
+        }
+
+        function stopWatch(watch) {
+            if (watch) watch.active = false;
+        }
         let downloadNotifiedRunIdMem = null;
 
         function getDownloadRunId(data) {
@@ -183,8 +204,8 @@
                     downloadBtn.disabled = true;
                     downloadStopBtn.disabled = false;
                     downloadStatusText.textContent = '下载任务已启动...';
-                    if (downloadIntervalId) clearInterval(downloadIntervalId);
-                    downloadIntervalId = setInterval(updateDownloadStatus, 3000);
+                    stopWatch(downloadIntervalId);
+                    downloadIntervalId = startWatch(updateDownloadStatus);
                 } else {
                     alert(data.message);
                 }
@@ -234,8 +255,8 @@
                     monthDisplay.textContent = '';
                     gameDisplay.textContent = '';
 
-                    if (intervalId) clearInterval(intervalId);
-                    intervalId = setInterval(updateStatus, 3000);
+                    stopWatch(intervalId);
+                    intervalId = startWatch(updateStatus);
                 } else {
                     alert(data.message);
                 }
@@ -260,13 +281,15 @@
             }
         });
 
-        async function updateStatus() {
+        async function updateStatus(wait = false) {
             try {
-                const response = await fetch(`${basePath}/tool/api.php?action=get_status`);
+                const waitQuery = wait ? `&wait=1&since=${spiderSince}` : '';
+                const response = await fetch(`${basePath}/tool/api.php?action=get_status${waitQuery}`);
                 const data = await response.json();
+                spiderSince = data.revision || spiderSince;
 
                 if (!data.running) {
-                    clearInterval(intervalId);
+                    stopWatch(intervalId);
                     startBtn.disabled = false;
                     stopBtn.disabled = true;
                     if (!data.pid && !data.started_at) {
@@ -316,12 +339,14 @@
             }
         }
 
-        async function updateDownloadStatus() {
+        async function updateDownloadStatus(wait = false) {
             try {
-                const response = await fetch(`${basePath}/tool/api.php?action=download_status`);
+                const waitQuery = wait ? `&wait=1&since=${downloadSince}` : '';
+                const response = await fetch(`${basePath}/tool/api.php?action=download_status${waitQuery}`);
                 const data = await response.json();
+                downloadSince = data.revision || downloadSince;
                 if (!data.running) {
-                    clearInterval(downloadIntervalId);
+                    stopWatch(downloadIntervalId);
                     downloadBtn.disabled = false;
                     downloadStopBtn.disabled = true;
                     if (!data.pid && !data.started_at && !data.message && !data.stopped_reason && !(data.total_months > 0)) {
@@ -350,7 +375,8 @@
                     return;
                 }
 
-                downloadStatusText.textContent = `下载任务运行中... (完成 ${data.finished_months || 0}/${data.total_months || 0})`;
+                const skippedText = data.schedule_skipped ? `，${data.schedule_skipped}个未到重查时间` : '';
+                downloadStatusText.textContent = `下载任务运行中... (完成 ${data.finished_months || 0}/${data.total_months || 0}${skippedText})`;
             } catch (error) {
                 console.error('Error:', error);
             }
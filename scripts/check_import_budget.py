@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CLI = os.path.join(ROOT, "tool", "cli.py")
+
+READ_ONLY_COMMANDS = (
+    ["years"],
+    ["latest_month"],
+    ["games", "--page", "1"],
+    ["search", "test"],
+    ["candidates", "--date", "2000-01", "--name", "test"],
+    ["spider", "status"],
+    ["download", "status"],
+    ["115", "check_all", "status"],
+    ["115", "mirror", "status"],
+    ["nyaa_index", "status"],
+)
+FORBIDDEN = ("requests", "bs4", "lxml", "urllib3", "p115client")
+
+
+def _write_config(tmp_dir):
+    with open(os.path.join(ROOT, "tool", "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(
+        db_path=os.path.join(tmp_dir, "getchu.db"),
+        status_dir=os.path.join(tmp_dir, "status"),
+        log_path=os.path.join(tmp_dir, "logs", "app.log"),
+    )
+    path = os.path.join(tmp_dir, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return path
+
+
+def _parse_importtime(stderr):
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        modules[parts[2]] = int(parts[0])
+    return modules
+
+
+def measure(argv, config_path):
+    env = dict(os.environ, GAL_CONFIG=config_path, HOME=ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI] + argv,
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    modules = _parse_importtime(proc.stderr)
+    offenders = sorted(m for m in modules if m.split(".")[0] in FORBIDDEN)
+    return {
+        "command": " ".join(argv),
+        "returncode": proc.returncode,
+        "import_ms": round(sum(modules.values()) / 1000, 1),
+        "modules": len(modules),
+        "forbidden": sorted({m.split(".")[0] for m in offenders}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=0, help="总导入耗时上限（0 表示不检查）")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = _write_config(tmp_dir)
+        for argv in READ_ONLY_COMMANDS:
+            result = measure(list(argv), config_path)
+            over_budget = bool(args.budget_ms) and result["import_ms"] > args.budget_ms
+            result["ok"] = result["returncode"] == 0 and not result["forbidden"] and not over_budget
+            failed = failed or not result["ok"]
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+from tool import db
+
+# 迁移系统引入之前的 getchu.db：早期版本只有前几列，之后的版本通过 ALTER TABLE 补齐
+LEGACY_SCHEMAS = {
+    "legacy_full": """
+        CREATE TABLE getchu_games (
+            date TEXT,
+            name TEXT,
+            company TEXT,
+            size TEXT,
+            link TEXT,
+            nyaa_name TEXT,
+            comment TEXT,
+            downloaded INTEGER DEFAULT 0,
+            infohash_hex TEXT,
+            PRIMARY KEY (date, name)
+        )
+    """,
+    "legacy_early": """
+        CREATE TABLE getchu_games (
+            date TEXT,
+            name TEXT,
+            company TEXT,
+            size TEXT,
+            link TEXT,
+            comment TEXT,
+            PRIMARY KEY (date, name)
+        )
+    """,
+}
+LEGACY_ROWS = (
+    {"date": "2023-01-27", "name": "テストゲーム", "company": "テスト社", "size": "3.2 GiB", "link": "magnet:?xt=urn:btih:" + "a" * 40},
+    {"date": "2023-12-15", "name": "Sample Title", "company": "Sample", "size": None, "link": None},
+    {"date": "2024-02-29", "name": "リンクなし", "company": "会社", "size": "", "link": ""},
+)
+DATA_COLUMNS = ("date", "name", "company", "size", "link", "comment")
+
+EXPECTED_COLUMNS = {
+    "getchu_games": {
+        "id", "nyaa_name", "downloaded", "infohash_hex", "year", "month", "last_checked_at", "attempts", "last_result",
+    },
+    "jobs": {"attempts", "revision"},
+}
+EXPECTED_TABLES = {
+    "nyaa_torrents", "nyaa_index_state", "jobs", "job_checkpoints", "nyaa_candidates",
+    "p115_files", "p115_mirror_state", "rate_limits",
+}
+EXPECTED_INDEXES = {
+    "idx_getchu_games_ym_name", "idx_getchu_games_missing_link", "idx_nyaa_torrents_infohash",
+    "idx_nyaa_torrents_date", "idx_jobs_state", "idx_jobs_type", "idx_jobs_revision",
+    "idx_p115_files_parent", "idx_p115_files_norm",
+}
+FTS_TABLES = {"getchu_games_fts", "nyaa_torrents_fts", "p115_files_fts"}
+
+
+def _fts_supported():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def _build_legacy(path, schema):
+    conn = sqlite3.connect(path)
+    conn.execute(schema)
+    for row in LEGACY_ROWS:
+        conn.execute(
+            "INSERT INTO getchu_games (date, name, company, size, link, comment) VALUES (?, ?, ?, ?, ?, ?)",
+            tuple(row.get(c) for c in DATA_COLUMNS),
+        )
+    conn.commit()
+    conn.close()
+
+
+def check_legacy(case, schema, fts):
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "getchu.db")
+        _build_legacy(path, schema)
+
+        conn = db.connect(path)
+        version = db.schema_version(conn)
+        if version != len(db.MIGRATIONS):
+            errors.append(f"user_version={version}，应为{len(db.MIGRATIONS)}")
+
+        for table, columns in EXPECTED_COLUMNS.items():
+            present = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})").fetchall()}
+            errors.extend(f"缺少列 {table}.{c}" for c in sorted(columns - present))
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master").fetchall()}
+        errors.extend(f"缺少表 {t}" for t in sorted(EXPECTED_TABLES - names))
+        errors.extend(f"缺少索引 {i}" for i in sorted(EXPECTED_INDEXES - names))
+        if fts:
+            errors.extend(f"缺少全文索引 {t}" for t in sorted(FTS_TABLES - names))
+
+        rows = conn.execute(
+            f"SELECT {', '.join(DATA_COLUMNS)}, year, month, downloaded, attempts FROM getchu_games ORDER BY date"
+        ).fetchall()
+        if len(rows) != len(LEGACY_ROWS):
+            errors.append(f"迁移后行数为{len(rows)}，应为{len(LEGACY_ROWS)}")
+        for expected, row in zip(LEGACY_ROWS, rows):
+            if tuple(expected.get(c) for c in DATA_COLUMNS) != tuple(row[: len(DATA_COLUMNS)]):
+                errors.append(f"行数据被改变: {expected['name']}")
+            year, month = int(expected["date"][:4]), int(expected["date"][5:7])
+            if tuple(row[len(DATA_COLUMNS) : len(DATA_COLUMNS) + 2]) != (year, month):
+                errors.append(f"year/month 计算错误: {expected['name']}")
+            if row[-2] not in (0, None) or row[-1] != 0:
+                errors.append(f"新增列默认值错误: {expected['name']}")
+
+        if fts and "getchu_games_fts" in names:
+            hits = conn.execute("SELECT COUNT(*) FROM getchu_games_fts WHERE getchu_games_fts MATCH ?", ('"テストゲ"',)).fetchone()[0]
+            if hits != 1:
+                errors.append("全文索引未包含迁移前的数据")
+
+        # 已是最新版本时不应再写入任何内容
+        raw = sqlite3.connect(path)
+        db.migrate(raw)
+        if raw.total_changes:
+            errors.append("最新版本的数据库再次迁移时发生了写入")
+        raw.close()
+        db.close_all()
+
+    sys.stdout.write(json.dumps({"case": case, "errors": errors, "ok": not errors}, ensure_ascii=False) + "\n")
+    return not errors
+
+
+def main():
+    fts = _fts_supported()
+    ok = True
+    for case, schema in LEGACY_SCHEMAS.items():
+        ok = check_legacy(case, schema, fts) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from tool import parsers
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURES = (
+    ("getchu", os.path.join(FIXTURES_DIR, "getchu_price.html")),
+    ("nyaa", os.path.join(FIXTURES_DIR, "nyaa_search.html")),
+)
+
+
+# 以下两个函数保留改用 SoupStrainer 之前 core.py 中的完整解析逻辑，作为对照
+def _reference_getchu(html):
+    soup = BeautifulSoup(html, "html.parser")
+    rows = []
+    for row in soup.find_all("tr", bgcolor="#ffffff"):
+        columns = row.find_all("td")
+        if len(columns) >= 3:
+            rows.append((columns[1].text.strip(), columns[2].text.strip()))
+    return rows
+
+
+def _reference_nyaa(html):
+    soup = BeautifulSoup(html, "html.parser")
+    rows = []
+    for row in soup.find_all("tr"):
+        cells = row.find_all("td")
+        if len(cells) >= 5:
+            link_views = cells[1].select('a[href*="view"]')
+            name_element = link_views[-1] if len(link_views) > 0 else None
+            name = name_element.attrs["title"] if name_element else cells[1].get_text(strip=True)
+
+            link_element = next(
+                (a for a in cells[2].select("a[href]") if "magnet:?xt=urn:btih:" in a.attrs["href"]),
+                None,
+            )
+            link = link_element.attrs["href"] if link_element else ""
+
+            size = cells[3].get_text(strip=True)
+            date_str = cells[4].get_text(strip=True)
+            try:
+                date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
+                date_str_formatted = date_obj.strftime("%Y-%m-%d %H:%M")
+            except ValueError:
+                date_str_formatted = None
+
+            rows.append((date_str_formatted, size, name, link))
+    return rows
+
+
+def _fast_rows(kind, html):
+    if kind == "getchu":
+        rows = [parsers.parse_getchu_row(r) for r in parsers.extract_getchu_rows(html)]
+    else:
+        rows = [parsers.parse_nyaa_row(r) for r in parsers.extract_nyaa_rows(html)]
+    return [parsers._row_key(r) for r in rows if r is not None]
+
+
+def check(kind, path):
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    expected = _reference_getchu(html) if kind == "getchu" else _reference_nyaa(html)
+    actual = _fast_rows(kind, html)
+    mismatch = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), None)
+    ok = bool(expected) and expected == actual
+    sys.stdout.write(
+        json.dumps(
+            {
+                "kind": kind,
+                "file": os.path.relpath(path, ROOT),
+                "features": parsers.html_features(),
+                "expected_rows": len(expected),
+                "rows": len(actual),
+                "first_mismatch": mismatch,
+                "ok": ok,
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", type=int, default=0, help="基准测试的重复次数（0 表示不测试）")
+    args = parser.parse_args()
+
+    ok = True
+    for kind, path in FIXTURES:
+        ok = check(kind, path) and ok
+    if args.bench:
+        for kind, path in FIXTURES:
+            for result in parsers.bench(kind, [path], args.bench):
+                result["file"] = os.path.relpath(result["file"], ROOT)
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+YM_INDEX = "idx_getchu_games_ym_name"
+MISSING_LINK_INDEX = "idx_getchu_games_missing_link"
+# check_all_worker 中按月读取已有链接的查询
+CHECK_ALL_SQL = (
+    "SELECT date, name, link FROM getchu_games WHERE year = ? AND month = ? AND link IS NOT NULL AND link != ''"
+)
+
+
+def _write_config(tmp_dir):
+    with open(os.path.join(ROOT, "tool", "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(
+        db_path=os.path.join(tmp_dir, "getchu.db"),
+        status_dir=os.path.join(tmp_dir, "status"),
+        log_path=os.path.join(tmp_dir, "logs", "app.log"),
+    )
+    path = os.path.join(tmp_dir, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    return path
+
+
+def _seed(conn):
+    rows = []
+    for year in range(2000, 2025):
+        for month in range(1, 13):
+            for i in range(8):
+                link = "magnet:?xt=urn:btih:" + f"{year}{month:02d}{i:02d}".ljust(40, "0") if i % 2 or year == 2024 else None
+                rows.append((f"{year}-{month:02d}", f"game {year} {month} {i}", "company", link))
+    conn.executemany("INSERT INTO getchu_games (date, name, company, link) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def _capture(conn, func, *args, **kwargs):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        func(*args, **kwargs)
+    finally:
+        conn.set_trace_callback(None)
+    return [
+        " ".join(s.split())
+        for s in statements
+        if s.lstrip().upper().startswith("SELECT") and "FROM getchu_games" in s and "COUNT(*)" not in s
+    ]
+
+
+def _plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def check(case, conn, sql, index, params=(), search=True):
+    plan = _plan(conn, sql, params)
+    used = any(index in detail for detail in plan)
+    if search:
+        used = used and any(detail.startswith("SEARCH") and index in detail for detail in plan)
+    ok = used and not any("USE TEMP B-TREE" in detail for detail in plan)
+    sys.stdout.write(json.dumps({"case": case, "index": index, "plan": plan, "ok": ok}, ensure_ascii=False) + "\n")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["GAL_CONFIG"] = _write_config(tmp_dir)
+
+        from tool import core, queries
+        from tool.db import close_all, connect
+
+        conn = connect()
+        _seed(conn)
+
+        cursor = queries.encode_page_cursor(queries.query_games_page(2023, None, per_page=5)[0][-1])
+        cases = [
+            ("games_month", _capture(conn, queries.query_games_page, 2023, 6), YM_INDEX, True),
+            ("games_cursor", _capture(conn, queries.query_games_page, 2023, None, per_page=5, cursor=cursor), YM_INDEX, True),
+            ("games_all", _capture(conn, queries.get_games_data), YM_INDEX, False),
+            ("latest_month", _capture(conn, queries.get_latest_month), YM_INDEX, False),
+            ("years", _capture(conn, queries.get_years_list), YM_INDEX, False),
+            # 2024 年的游戏都有链接，download_games_by_month 查完缺链接的游戏后直接返回，不会访问网络
+            ("missing_link", _capture(conn, core.download_games_by_month, 2024, 3), MISSING_LINK_INDEX, True),
+        ]
+
+        ok = True
+        for case, statements, index, search in cases:
+            if not statements:
+                sys.stdout.write(json.dumps({"case": case, "error": "未捕获到查询", "ok": False}, ensure_ascii=False) + "\n")
+                ok = False
+            for sql in statements:
+                ok = check(case, conn, sql, index, search=search) and ok
+        ok = check("check_all_links", conn, CHECK_ALL_SQL, YM_INDEX, (2023, 6)) and ok
+        close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+
+from tool.models import NyaaData
+from tool.scoring import get_scorer
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_golden.json")
+
+
+def _candidates(items):
+    return [NyaaData(c.get("date"), c.get("size"), c["name"], c.get("link", "magnet:?xt=urn:btih:" + "0" * 40)) for c in items]
+
+
+def check_golden(scorer, path=GOLDEN_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    failed = False
+    for case in cases:
+        year, month = map(int, case["game"]["date"].split("-"))
+        selected, score, accepted = scorer.select(_candidates(case["candidates"]), case["game"]["name"], year, month)
+        name = selected.name if selected else None
+        ok = name == case["expected"] and accepted == case["accepted"]
+        failed = failed or not ok
+        sys.stdout.write(
+            json.dumps(
+                {"case": case["case"], "selected": name, "score": score, "accepted": accepted, "ok": ok},
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+    return not failed
+
+
+def _stored_groups():
+    from tool.db import connect
+
+    conn = connect()
+    groups = []
+    for (game_date, game_name), rows in itertools.groupby(
+        conn.execute(
+            "SELECT game_date, game_name, date, size, name, magnet FROM nyaa_candidates ORDER BY game_date, game_name"
+        ).fetchall(),
+        key=lambda row: (row[0], row[1]),
+    ):
+        year, month = map(int, game_date.split("-")[:2])
+        groups.append((game_name, year, month, [NyaaData(r[2], r[3], r[4], r[5] or "") for r in rows]))
+    return groups
+
+
+def _golden_groups(n, path=GOLDEN_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        cases = [case for case in json.load(f) if case["candidates"]]
+    groups = []
+    count = 0
+    for case in itertools.cycle(cases):
+        if count >= n:
+            break
+        year, month = map(int, case["game"]["date"].split("-"))
+        candidates = _candidates(case["candidates"])
+        groups.append((case["game"]["name"], year, month, candidates))
+        count += len(candidates)
+    return groups
+
+
+def bench(scorer, n):
+    groups = _stored_groups()
+    source = "nyaa_candidates"
+    if sum(len(g[3]) for g in groups) < n:
+        groups = _golden_groups(n)
+        source = "golden"
+    total = sum(len(g[3]) for g in groups)
+    started = time.perf_counter()
+    for game_name, year, month, candidates in groups:
+        scorer.select(candidates, game_name, year, month)
+    elapsed = time.perf_counter() - started
+    return {
+        "source": source,
+        "games": len(groups),
+        "candidates": total,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "candidates_per_s": int(total / elapsed) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", type=int, default=0, help="基准测试的候选数量（0 表示不测试）")
+    parser.add_argument("--min-rate", type=int, default=0, help="每秒评分候选数下限（0 表示不检查）")
+    args = parser.parse_args()
+
+    scorer = get_scorer()
+    ok = check_golden(scorer)
+    if args.bench:
+        result = bench(scorer, args.bench)
+        result["ok"] = not args.min_rate or (result["candidates_per_s"] or 0) >= args.min_rate
+        ok = ok and result["ok"]
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ print(f"测试游戏: [{test_company}]{test_game}")
 
 year = 2018
 month = 1
-nyaa_data_list = get_nyaa_data(test_game, test_company)
+nyaa_data_list = get_nyaa_data(test_game, test_company) or []
 # 输出nyaa_data_list中所有的name
 for data in nyaa_data_list:
     print(data.name)
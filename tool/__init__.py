@@ -1,15 +1,41 @@
-from .core import (
-    clear_link,
-    deduplicate_games,
-    download_games_by_month,
-    ensure_getchu_schema,
-    get_all_getchu_games,
-    get_db_path,
-    get_download_link,
-    get_games_data,
-    get_getchu_games,
-    get_nyaa_data,
-    get_raw_getchu_games,
-    get_years_list,
-)
+import importlib
 
+
+_EXPORTS = {
+    "bulk_insert_games": "queries",
+    "clear_link": "core",
+    "deduplicate_games": "core",
+    "delete_game_record": "queries",
+    "download_games_by_month": "core",
+    "ensure_getchu_schema": "db",
+    "get_all_getchu_games": "core",
+    "get_db_path": "queries",
+    "get_download_link": "core",
+    "get_games_data": "queries",
+    "get_getchu_games": "core",
+    "get_latest_month": "queries",
+    "get_nyaa_data": "core",
+    "get_raw_getchu_games": "core",
+    "get_years_list": "queries",
+    "list_candidates": "queries",
+    "query_games_page": "queries",
+    "reselect_games": "core",
+    "search_games": "queries",
+    "set_downloaded_status": "queries",
+    "update_game_record": "queries",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -19,7 +19,60 @@ function as_int($value, $default = null) {
     return intval($value);
 }
 
+function daemon_socket_path() {
+    $root = realpath(__DIR__ . '/..');
+    $path = getenv('GAL_DAEMON_SOCKET');
+    if ($path) return $path;
+
+    $config = json_decode(@file_get_contents(__DIR__ . '/config.json'), true);
+    if (!is_array($config)) $config = [];
+    if (!empty($config['daemon_socket'])) {
+        $path = $config['daemon_socket'];
+    } else {
+        $status_dir = !empty($config['status_dir']) ? $config['status_dir'] : 'status';
+        $path = rtrim($status_dir, '/') . '/cli.sock';
+    }
+    return $path[0] === '/' ? $path : $root . '/' . $path;
+}
+
+function call_daemon($args) {
+    if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') return null;
+    $path = daemon_socket_path();
+    if (!file_exists($path)) return null;
+
+    $sock = @stream_socket_client('unix://' . $path, $errno, $errstr, 2);
+    if (!$sock) return null;
+    stream_set_timeout($sock, 120);
+
+    $request = ['jsonrpc' => '2.0', 'id' => 1, 'method' => 'run', 'params' => array_values($args)];
+    fwrite($sock, json_encode($request, JSON_UNESCAPED_UNICODE) . "\n");
+    $line = fgets($sock);
+    fclose($sock);
+    if ($line === false) return null;
+
+    $response = json_decode($line, true);
+    if (!is_array($response)) return null;
+    if (isset($response['error'])) {
+        return [1, ['status' => 'error', 'message' => $response['error']['message'] ?? '守护进程执行失败']];
+    }
+    return [0, $response['result'] ?? null];
+}
+
+function status_args($args) {
+    if (empty($_GET['wait'])) return $args;
+    $args[] = '--wait';
+    $since = as_int($_GET['since'] ?? null, null);
+    if ($since !== null) { $args[] = '--since'; $args[] = strval($since); }
+    $timeout = as_int($_GET['timeout'] ?? 25, 25);
+    $args[] = '--timeout';
+    $args[] = strval(min(25, max(1, $timeout)));
+    return $args;
+}
+
 function run_cli($args) {
+    $daemon = call_daemon($args);
+    if ($daemon !== null) return $daemon;
+
     $root = realpath(__DIR__ . '/..');
     $cli = __DIR__ . '/cli.py';
 
@@ -82,19 +135,41 @@ if ($action === 'games') {
     $page = as_int($_GET['page'] ?? 1, 1);
     $year = as_int($_GET['year'] ?? null, null);
     $month = as_int($_GET['month'] ?? null, null);
+    $cursor = isset($_GET['cursor']) ? trim(strval($_GET['cursor'])) : '';
 
     $args = ['games', '--page', strval(max(1, $page))];
     if ($year !== null) $args[] = '--year';
     if ($year !== null) $args[] = strval($year);
     if ($month !== null) $args[] = '--month';
     if ($month !== null) $args[] = strval($month);
+    if ($cursor !== '') $args[] = '--cursor';
+    if ($cursor !== '') $args[] = $cursor;
+
+    [$code, $data] = run_cli($args);
+    json_response($data);
+}
+
+if ($action === 'search') {
+    $q = isset($_GET['q']) ? trim(strval($_GET['q'])) : '';
+    if ($q === '') json_response(['status' => 'error', 'message' => '缺少搜索关键字']);
+    $page = as_int($_GET['page'] ?? 1, 1);
+    $year = as_int($_GET['year'] ?? null, null);
+    $month = as_int($_GET['month'] ?? null, null);
+
+    $args = ['search', '--page', strval(max(1, $page))];
+    if ($year !== null) $args[] = '--year';
+    if ($year !== null) $args[] = strval($year);
+    if ($month !== null) $args[] = '--month';
+    if ($month !== null) $args[] = strval($month);
+    $args[] = '--';
+    $args[] = $q;
 
     [$code, $data] = run_cli($args);
     json_response($data);
 }
 
 if ($action === 'get_status') {
-    [$code, $data] = run_cli(['spider', 'status']);
+    [$code, $data] = run_cli(status_args(['spider', 'status']));
     json_response($data);
 }
 
@@ -121,12 +196,14 @@ if ($action === 'start_download') {
     if ($year === null) {
         json_response(['status' => 'error', 'message' => '参数错误']);
     }
-    [$code, $data] = run_cli(['download', 'start', '--year', strval($year), '--month', strval($month)]);
+    $args = ['download', 'start', '--year', strval($year), '--month', strval($month)];
+    if (!empty($body['force'])) { $args[] = '--force'; }
+    [$code, $data] = run_cli($args);
     json_response($data);
 }
 
 if ($action === 'download_status') {
-    [$code, $data] = run_cli(['download', 'status']);
+    [$code, $data] = run_cli(status_args(['download', 'status']));
     json_response($data);
 }
 
@@ -194,7 +271,7 @@ if ($action === '115_check_all_start') {
 }
 
 if ($action === '115_check_all_status') {
-    [$code, $data] = run_cli(['115', 'check_all', 'status']);
+    [$code, $data] = run_cli(status_args(['115', 'check_all', 'status']));
     json_response($data);
 }
 
@@ -238,4 +315,14 @@ if ($action === 'delete_game') {
     json_response($data);
 }
 
+if ($action === 'candidates') {
+    $date = isset($_GET['date']) ? trim(strval($_GET['date'])) : '';
+    $name = isset($_GET['name']) ? strval($_GET['name']) : '';
+    if ($date === '' || $name === '') {
+        json_response(['status' => 'error', 'message' => '缺少必填字段 date/name']);
+    }
+    [$code, $data] = run_cli(['candidates', '--date', $date, '--name', $name]);
+    json_response($data);
+}
+
 json_response(['status' => 'error', 'message' => 'unknown action']);
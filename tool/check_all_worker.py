@@ -0,0 +1,126 @@
+import concurrent.futures as cf
+
+from tool import queries
+from tool.core import game_key
+from tool.db import connect
+from tool.runtime import now_ts, runtime_paths
+
+
+def _check(session, link, timeout_s):
+    from tool.p115_client import DeadlineExceeded, check_magnet_exists
+
+    try:
+        with session.deadline(timeout_s):
+            return check_magnet_exists(link, "", session), None
+    except DeadlineExceeded:
+        return None, "timeout"
+
+
+def _check_local(link):
+    from tool.p115_mirror import check_magnet_local
+
+    return check_magnet_local(link), None
+
+
+def run(job):
+    from tool.p115_client import P115Session
+
+    year = job.params.get("year")
+    month = job.params.get("month")
+
+    config = runtime_paths()["config"]
+    workers = max(1, int(config.get("115_check_concurrency", 4)))
+    timeout_s = float(config.get("115_check_timeout", 60))
+    source = job.params.get("source") or config.get("115_check_source", "live")
+
+    completed = job.completed_items()
+    status = job.status
+    if not completed:
+        status.update({"checked": 0, "found_downloaded": 0, "errors": []})
+    status.update(
+        {
+            "running": True,
+            "total": 0,
+            "checked": len(completed),
+            "current": None,
+            "resumed": bool(completed),
+            "started_at": status.get("started_at") or now_ts(),
+            "stopped_reason": None,
+        }
+    )
+    status.setdefault("found_downloaded", 0)
+    status.setdefault("errors", [])
+
+    session = P115Session.from_config(config)
+    if session.client is None:
+        status["stopped_reason"] = "not_logged_in"
+        status["errors"].append("115 未登录")
+        return False
+
+    if source == "local":
+        from tool.p115_mirror import sync_mirror
+
+        status["current"] = {"date": None, "name": "同步115目录镜像"}
+        job.report(force=True)
+        status["mirror"] = sync_mirror(session=session)
+        # 本地查询只受 SQLite 限制，无需并发
+        workers = 1
+
+    conn = connect()
+    if year and month:
+        rows = conn.execute(
+            "SELECT date, name, link FROM getchu_games WHERE year = ? AND month = ? AND link IS NOT NULL AND link != ''",
+            (int(year), int(month)),
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT date, name, link FROM getchu_games WHERE link IS NOT NULL AND link != ''").fetchall()
+
+    status["total"] = len(rows)
+    job.report(status["checked"] / len(rows) * 100 if rows else 0.0, force=True)
+
+    pending = iter([row for row in rows if game_key(row[0], row[1]) not in completed])
+    in_flight = {}
+    ex = cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="p115")
+    try:
+        while True:
+            # 只保持少量排队中的任务，停止时不再提交新的校验
+            while len(in_flight) < workers * 2 and not job.stop_requested:
+                row = next(pending, None)
+                if row is None:
+                    break
+                if source == "local":
+                    fut = ex.submit(_check_local, row[2])
+                else:
+                    fut = ex.submit(_check, session, row[2], timeout_s)
+                in_flight[fut] = row
+                status["current"] = {"date": row[0], "name": row[1]}
+            if not in_flight:
+                break
+            done, _ = cf.wait(in_flight, timeout=1.0, return_when=cf.FIRST_COMPLETED)
+            for fut in done:
+                date, name, _ = in_flight.pop(fut)
+                outcome = "error"
+                try:
+                    result, err = fut.result()
+                    if err:
+                        status["errors"].append(f"{date}/{name}: {err}")
+                    elif isinstance(result, dict) and result.get("exists"):
+                        queries.set_downloaded_status(date, name, 1, result.get("infohash_hex"))
+                        status["found_downloaded"] += 1
+                        outcome = "exists"
+                    else:
+                        outcome = "missing"
+                except Exception as e:
+                    status["errors"].append(f"{date}/{name}: {e}")
+                status["checked"] += 1
+                if outcome != "error":
+                    job.checkpoint(conn, game_key(date, name), outcome)
+                    conn.commit()
+                job.report(status["checked"] / len(rows) * 100)
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+    if job.stop_requested:
+        status["stopped_reason"] = "manual_stop"
+    status["current"] = None
+    return True
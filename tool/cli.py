@@ -1,29 +1,28 @@
 import argparse
 import json
 import os
-import signal
-import subprocess
 import sys
 import time
 import threading
-import concurrent.futures as cf
-import multiprocessing as mp
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 
 import tool
-from tool.runtime import now_ts, pid_is_running, read_json, runtime_paths, terminate_pid, write_json_atomic
+from tool.runtime import runtime_paths
+
+
+_output = threading.local()
 
 
 def _print(obj):
+    sink = getattr(_output, "sink", None)
+    if sink is not None:
+        sink.append(obj)
+        return
     sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
     sys.stdout.flush()
 
 
-def _base_dir():
-    return os.path.dirname(os.path.abspath(__file__))
-
-
 def _spider_status_default():
     return {
         "running": False,
@@ -49,6 +48,7 @@ def _download_status_default():
         "current_month": None,
         "finished_months": 0,
         "total_months": 0,
+        "schedule_skipped": 0,
         "started_at": None,
         "updated_at": None,
         "message": None,
@@ -60,13 +60,13 @@ def cmd_years(args):
     years = tool.get_years_list()
     _print({"years": years})
 
+
 def cmd_latest_month(args):
-    games = tool.get_games_data()
-    if not games:
+    year, month = tool.get_latest_month()
+    if year is None:
         _print({"year": None, "month": None})
         return
-    g = games[0]
-    _print({"year": int(g.year), "month": int(g.month)})
+    _print({"year": int(year), "month": int(month)})
 
 
 def cmd_games(args):
@@ -80,16 +80,11 @@ def cmd_games(args):
     year = int(args.year) if args.year is not None else None
     month = int(args.month) if args.month is not None else None
 
-    all_games = tool.get_games_data()
-    if year:
-        all_games = [g for g in all_games if g.year == year]
-    if month:
-        all_games = [g for g in all_games if g.month == month]
-
-    total = len(all_games)
-    start = (page - 1) * per_page
-    end = start + per_page
-    games_data = all_games[start:end]
+    try:
+        games_data, total, next_cursor = tool.query_games_page(year, month, page, per_page, args.cursor)
+    except ValueError:
+        _print({"status": "error", "message": "无效的分页游标"})
+        return
 
     _print(
         {
@@ -109,180 +104,120 @@ def cmd_games(args):
             "current_page": page,
             "per_page": per_page,
             "total": total,
+            "next_cursor": next_cursor,
         }
     )
 
 
-def cmd_spider_status(args):
+def cmd_search(args):
     paths = runtime_paths()
-    status = read_json(paths["spider_status_path"], _spider_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and not pid_is_running(int(pid)):
-        status["running"] = False
-        status["stopped_reason"] = "not_running"
-        write_json_atomic(paths["spider_status_path"], status)
-    _print(status)
+    config = paths["config"]
+    per_page = int(config.get("per_page", 50))
+    page = max(1, int(args.page))
 
+    started = time.perf_counter()
+    results, total = tool.search_games(args.query, page, per_page, args.year, args.month)
+    _print(
+        {
+            "data": [
+                {
+                    "year": g.year,
+                    "month": g.month,
+                    "name": g.name,
+                    "company": g.company,
+                    "download_url": g.link,
+                    "nyaa_name": g.nyaa_name,
+                    "comment": g.comment,
+                    "downloaded": g.downloaded,
+                    "snippet": snippet,
+                }
+                for g, snippet in results
+            ],
+            "query": args.query,
+            "current_page": page,
+            "per_page": per_page,
+            "total": total,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    )
 
-def cmd_spider_start(args):
-    paths = runtime_paths()
-    status = read_json(paths["spider_status_path"], _spider_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and pid_is_running(int(pid)):
-        _print({"status": "error", "message": "爬虫已在运行中", "pid": int(pid)})
-        return
 
-    start_year = int(args.start_year)
-    end_year = int(args.end_year)
-    if start_year > end_year:
-        start_year, end_year = end_year, start_year
+def _start_job(job_type, params, label):
+    from tool import jobs
 
-    os.makedirs(paths["status_dir"], exist_ok=True)
-    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
-
-    spider_launch_log = os.path.join(os.path.dirname(paths["log_path"]) or ".", "spider_launch.log")
-    launch_fp = open(spider_launch_log, "ab", buffering=0)
-
-    p = subprocess.Popen(
-        [
-            sys.executable,
-            os.path.join(_base_dir(), "spider_worker.py"),
-            "--start-year",
-            str(start_year),
-            "--end-year",
-            str(end_year),
-        ],
-        cwd=_base_dir(),
-        stdout=launch_fp,
-        stderr=launch_fp,
-        start_new_session=True,
-    )
-    started = False
-    for _ in range(10):
-        time.sleep(0.2)
-        status = read_json(paths["spider_status_path"], _spider_status_default())
-        if status.get("pid") == p.pid:
-            started = True
-            break
-
-    if not started:
-        try:
-            if pid_is_running(int(p.pid)):
-                terminate_pid(int(p.pid), signal.SIGTERM)
-        except Exception:
-            pass
+    jobs.reap_stale()
+    conflicting = [
+        job for job in jobs.list_jobs(job_type=job_type, limit=100)
+        if job["state"] in jobs.ACTIVE_STATES and jobs.conflicts(job_type, params, job["type"], job["params"])
+    ]
+    job_id = jobs.enqueue(job_type, params)
+    pid = jobs.ensure_scheduler()
+    if pid is None:
+        jobs.cancel(job_id)
         _print(
             {
                 "status": "error",
-                "message": "爬虫启动失败，请检查写权限（status/logs/getchu.db）与Python依赖是否已安装",
+                "message": f"{label}启动失败，请检查写权限（status/logs/getchu.db）与Python依赖是否已安装",
             }
         )
         return
+    message = f"{label}已加入队列" if conflicting else f"{label}已启动"
+    _print({"status": "success", "message": message, "job_id": job_id, "pid": pid})
 
-    _print({"status": "success", "message": "爬虫已启动", "pid": p.pid})
 
+def _stop_jobs(job_type, not_found_message):
+    from tool import jobs
 
-def cmd_spider_stop(args):
-    paths = runtime_paths()
-    status = read_json(paths["spider_status_path"], _spider_status_default())
-    pid = status.get("pid")
-    if not pid:
-        _print({"status": "error", "message": "未找到运行中的爬虫"})
+    cancelled = jobs.cancel_type(job_type)
+    if not cancelled:
+        _print({"status": "error", "message": not_found_message})
         return
-    try:
-        if pid_is_running(int(pid)):
-            terminate_pid(int(pid), signal.SIGTERM)
-        status["running"] = False
-        status["stopped_reason"] = "stopped"
-        write_json_atomic(paths["spider_status_path"], status)
-        _print({"status": "success", "message": "停止请求已发送", "pid": int(pid)})
-    except Exception as e:
-        _print({"status": "error", "message": str(e), "pid": int(pid)})
+    _print({"status": "success", "message": "停止请求已发送", "job_ids": cancelled})
 
 
-def cmd_download_status(args):
-    paths = runtime_paths()
-    status = read_json(paths["download_status_path"], _download_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and not pid_is_running(int(pid)):
-        status["running"] = False
-        status["stopped_reason"] = "not_running"
-        write_json_atomic(paths["download_status_path"], status)
-    _print(status)
+def _print_type_status(job_type, default, args):
+    from tool import jobs
 
+    if args.wait:
+        _print(jobs.wait_type_status(job_type, default, args.since, max(0.0, args.timeout)))
+    else:
+        _print(jobs.type_status(job_type, default))
 
-def cmd_download_start(args):
-    paths = runtime_paths()
-    status = read_json(paths["download_status_path"], _download_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and pid_is_running(int(pid)):
-        _print({"status": "error", "message": "下载任务已在运行中", "pid": int(pid)})
-        return
 
-    year = int(args.year)
-    month = int(args.month) if args.month is not None else 0
+def _add_wait_args(parser):
+    parser.add_argument("--wait", action="store_true")
+    parser.add_argument("--since", type=int)
+    parser.add_argument("--timeout", type=float, default=25)
 
-    os.makedirs(paths["status_dir"], exist_ok=True)
-    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
-
-    download_launch_log = os.path.join(os.path.dirname(paths["log_path"]) or ".", "download_launch.log")
-    launch_fp = open(download_launch_log, "ab", buffering=0)
-
-    p = subprocess.Popen(
-        [
-            sys.executable,
-            os.path.join(_base_dir(), "download_worker.py"),
-            "--year",
-            str(year),
-            "--month",
-            str(month),
-        ],
-        cwd=_base_dir(),
-        stdout=launch_fp,
-        stderr=launch_fp,
-        start_new_session=True,
-    )
-    started = False
-    for _ in range(10):
-        time.sleep(0.2)
-        status = read_json(paths["download_status_path"], _download_status_default())
-        if status.get("pid") == p.pid:
-            started = True
-            break
-
-    if not started:
-        try:
-            if pid_is_running(int(p.pid)):
-                terminate_pid(int(p.pid), signal.SIGTERM)
-        except Exception:
-            pass
-        _print(
-            {
-                "status": "error",
-                "message": "下载任务启动失败，请检查写权限（status/logs/getchu.db）与Python依赖是否已安装",
-            }
-        )
-        return
 
-    _print({"status": "success", "message": "下载任务已启动", "pid": p.pid})
+def cmd_spider_status(args):
+    _print_type_status("spider", _spider_status_default(), args)
+
+
+def cmd_spider_start(args):
+    start_year = int(args.start_year)
+    end_year = int(args.end_year)
+    if start_year > end_year:
+        start_year, end_year = end_year, start_year
+    _start_job("spider", {"start_year": start_year, "end_year": end_year, "no_cache": bool(args.no_cache)}, "爬虫")
+
+
+def cmd_spider_stop(args):
+    _stop_jobs("spider", "未找到运行中的爬虫")
+
+
+def cmd_download_status(args):
+    _print_type_status("download", _download_status_default(), args)
+
+
+def cmd_download_start(args):
+    month = int(args.month) if args.month is not None else 0
+    params = {"year": int(args.year), "month": month, "no_cache": bool(args.no_cache), "force": bool(args.force)}
+    _start_job("download", params, "下载任务")
 
 
 def cmd_download_stop(args):
-    paths = runtime_paths()
-    status = read_json(paths["download_status_path"], _download_status_default())
-    pid = status.get("pid")
-    if not pid:
-        _print({"status": "error", "message": "未找到运行中的下载任务"})
-        return
-    try:
-        if pid_is_running(int(pid)):
-            terminate_pid(int(pid), signal.SIGTERM)
-        status["running"] = False
-        status["stopped_reason"] = "stopped"
-        write_json_atomic(paths["download_status_path"], status)
-        _print({"status": "success", "message": "停止请求已发送", "pid": int(pid)})
-    except Exception as e:
-        _print({"status": "error", "message": str(e), "pid": int(pid)})
+    _stop_jobs("download", "未找到运行中的下载任务")
 
 
 def cmd_115_login_qrcode(args):
@@ -335,9 +270,13 @@ def cmd_115_login_status(args):
 
 def cmd_115_check(args):
     try:
-        from tool.p115_client import check_magnet_exists
         magnet = args.magnet
         save_path = args.dir or ""
+        if args.local:
+            from tool.p115_mirror import check_magnet_local
+            _print(check_magnet_local(magnet))
+            return
+        from tool.p115_client import check_magnet_exists
         _print(check_magnet_exists(magnet, save_path))
     except Exception as e:
         _print({"status": "error", "message": f"115模块加载失败: {e}"})
@@ -368,134 +307,134 @@ def _check_all_status_default():
     }
 
 
-def _check_magnet_exists_child(link, q):
-    try:
-        from tool.p115_client import check_magnet_exists
+def cmd_115_check_all_start(args):
+    params = {}
+    if args.year:
+        params["year"] = int(args.year)
+    if args.month:
+        params["month"] = int(args.month)
+    if args.source:
+        params["source"] = args.source
+    _start_job("check_all", params, "校验任务")
 
-        res = check_magnet_exists(link, "")
-        q.put({"ok": True, "res": res})
-    except Exception as e:
-        q.put({"ok": False, "error": str(e)})
-
-
-def _check_magnet_exists_with_timeout(link, timeout_s=60):
-    if os.name != "nt":
-        try:
-            ctx = mp.get_context("fork")
-        except Exception:
-            ctx = mp.get_context("spawn")
-
-        q = ctx.Queue(maxsize=1)
-        p = ctx.Process(target=_check_magnet_exists_child, args=(link, q))
-        p.daemon = True
-        p.start()
-        p.join(timeout_s)
-        if p.is_alive():
-            try:
-                p.terminate()
-            except Exception:
-                pass
-            p.join(5)
-            return None, "timeout"
-        try:
-            msg = q.get_nowait()
-        except Exception:
-            return None, "no_result"
-        if not isinstance(msg, dict):
-            return None, "bad_result"
-        if msg.get("ok") is True:
-            return msg.get("res"), None
-        return None, msg.get("error") or "error"
-
-    def _run():
-        from tool.p115_client import check_magnet_exists
 
-        return check_magnet_exists(link, "")
+def cmd_115_check_all_status(args):
+    _print_type_status("check_all", _check_all_status_default(), args)
+
 
-    ex = cf.ThreadPoolExecutor(max_workers=1)
+def cmd_115_check_all_stop(args):
+    _stop_jobs("check_all", "未找到运行中的校验任务")
+
+
+def cmd_115_mirror_sync(args):
     try:
-        fut = ex.submit(_run)
-        try:
-            res = fut.result(timeout=timeout_s)
-            return res, None
-        except cf.TimeoutError:
-            return None, "timeout"
-        except Exception as e:
-            return None, str(e)
-    finally:
-        try:
-            ex.shutdown(wait=False, cancel_futures=True)
-        except TypeError:
-            ex.shutdown(wait=False)
+        from tool.p115_mirror import sync_mirror
+        _print({"success": True, **sync_mirror(full=args.full)})
+    except Exception as e:
+        _print({"success": False, "message": str(e)})
 
 
+def cmd_115_mirror_status(args):
+    from tool.p115_mirror import mirror_status
 
-def cmd_115_check_all_start(args):
-    paths = runtime_paths()
-    status = read_json(paths["check_all_status_path"], _check_all_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and pid_is_running(int(pid)):
-        _print({"status": "error", "message": "校验任务已在运行中"})
+    _print(mirror_status())
+
+
+def _job_summary(job):
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "params": job["params"],
+        "state": job["state"],
+        "priority": job["priority"],
+        "progress": job["progress"],
+        "attempts": job["attempts"],
+        "pid": job["pid"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "heartbeat_at": job["heartbeat_at"],
+    }
+
+
+def cmd_jobs_enqueue(args):
+    from tool import jobs
+
+    try:
+        params = json.loads(args.params or "{}")
+    except ValueError:
+        _print({"status": "error", "message": "params 必须是JSON对象"})
         return
+    jobs.reap_stale()
+    try:
+        job_id = jobs.enqueue(args.type, params, args.priority)
+    except (KeyError, ValueError) as e:
+        _print({"status": "error", "message": str(e)})
+        return
+    pid = jobs.ensure_scheduler()
+    _print({"status": "success", "job_id": job_id, "pid": pid})
 
-    if not os.path.isdir(paths["status_dir"]):
-        os.makedirs(paths["status_dir"], exist_ok=True)
 
-    worker_args = [
-        sys.executable,
-        os.path.join(_base_dir(), "cli.py"),
-        "115", "check_all", "worker",
-    ]
-    if args.year:
-        worker_args += ["--year", str(args.year)]
-    if args.month:
-        worker_args += ["--month", str(args.month)]
-
-    p = subprocess.Popen(
-        worker_args,
-        cwd=_base_dir(),
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        start_new_session=True,
+def cmd_jobs_list(args):
+    from tool import jobs
+
+    jobs.reap_stale()
+    _print(
+        {
+            "jobs": [_job_summary(job) for job in jobs.list_jobs(args.state, args.type, args.limit)],
+            "scheduler": jobs.scheduler_status(),
+        }
     )
 
-    time.sleep(0.5)
-    if pid_is_running(p.pid):
-        _print({"status": "success", "message": "校验任务已启动", "pid": p.pid})
-    else:
-        _print({"status": "error", "message": "校验任务启动失败"})
 
+def cmd_jobs_show(args):
+    from tool import jobs
 
-def cmd_115_check_all_status(args):
-    paths = runtime_paths()
-    status = read_json(paths["check_all_status_path"], _check_all_status_default())
-    pid = status.get("pid")
-    if status.get("running") and pid and not pid_is_running(int(pid)):
-        status["running"] = False
-        write_json_atomic(paths["check_all_status_path"], status)
-    _print(status)
+    job = jobs.get_job(args.job_id)
+    if job is None:
+        _print({"status": "error", "message": "任务不存在"})
+        return
+    _print({**_job_summary(job), "checkpoints": jobs.checkpoint_count(job["id"]), "status": job["status"]})
 
 
-def cmd_115_check_all_stop(args):
-    paths = runtime_paths()
-    status = read_json(paths["check_all_status_path"], _check_all_status_default())
-    pid = status.get("pid")
-    if pid and pid_is_running(int(pid)):
-        try:
-            terminate_pid(int(pid))
-        except Exception as e:
-            _print({"status": "error", "message": f"停止失败: {e}"})
-            return
-    status["running"] = False
-    status["pid"] = None
-    status["stopped_reason"] = "manual_stop"
-    status["updated_at"] = now_ts()
-    write_json_atomic(paths["check_all_status_path"], status)
-    _print({"status": "success", "message": "已停止校验任务"})
+def cmd_jobs_cancel(args):
+    from tool import jobs
+
+    ok = jobs.cancel(args.job_id)
+    _print({"success": ok, "message": "已取消" if ok else "任务不存在或已结束"})
+
+
+def cmd_jobs_retry(args):
+    from tool import jobs
+
+    jobs.reap_stale()
+    ok = jobs.retry(args.job_id)
+    pid = jobs.ensure_scheduler() if ok else None
+    _print({"success": ok, "pid": pid, "message": "已重新入队" if ok else "任务不存在或未失败/取消"})
+
+
+def cmd_nyaa_index_sync(args):
+    from tool.core import configure_nyaa_rate
+    from tool.nyaa_index import sync_catalog
+
+    config = runtime_paths()["config"]
+    configure_nyaa_rate(float(config.get("nyaa_rate", 1.0)), int(config.get("nyaa_burst", 2)))
+    try:
+        result = sync_catalog(full=args.full, max_pages=args.max_pages)
+        _print({"success": True, **result})
+    except Exception as e:
+        _print({"success": False, "message": str(e)})
+
+
+def cmd_nyaa_index_status(args):
+    from tool.nyaa_index import catalog_status
+
+    _print(catalog_status())
 
 
 def cmd_update_game(args):
-    import tool.core
+    import tool.queries
     kwargs = {"date": args.date, "name": args.old_name}
     if args.new_date:
         kwargs["new_date"] = args.new_date
@@ -509,100 +448,29 @@ def cmd_update_game(args):
         kwargs["new_downloaded"] = args.new_downloaded
     if args.new_nyaa_name is not None:
         kwargs["new_nyaa_name"] = args.new_nyaa_name
-    ok = tool.core.update_game_record(**kwargs)
+    ok = tool.queries.update_game_record(**kwargs)
     _print({"success": ok, "message": "更新成功" if ok else "未找到匹配记录"})
 
 
-def cmd_delete_game(args):
-    import tool.core
-    ok = tool.core.delete_game_record(args.date, args.name)
-    _print({"success": ok, "message": "删除成功" if ok else "未找到匹配记录"})
+def cmd_candidates(args):
+    import tool.queries
+    candidates = tool.queries.list_candidates(args.date, args.name)
+    if candidates is None:
+        _print({"status": "error", "message": "未找到匹配记录"})
+        return
+    _print({"date": args.date, "name": args.name, "candidates": candidates})
 
 
+def cmd_reselect(args):
+    result = tool.reselect_games(args.year, args.month, args.include_downloaded, args.dry_run)
+    _print({"status": "success", **result})
 
-def cmd_115_check_all_worker(args):
-    import sqlite3
-    import tool.core
 
-    paths = runtime_paths()
-    status_path = paths["check_all_status_path"]
+def cmd_delete_game(args):
+    import tool.queries
+    ok = tool.queries.delete_game_record(args.date, args.name)
+    _print({"success": ok, "message": "删除成功" if ok else "未找到匹配记录"})
 
-    status = {
-        "running": True,
-        "pid": os.getpid(),
-        "total": 0,
-        "checked": 0,
-        "found_downloaded": 0,
-        "current": None,
-        "errors": [],
-        "started_at": now_ts(),
-        "stopped_reason": None,
-        "updated_at": now_ts(),
-    }
-    write_json_atomic(status_path, status)
-
-    conn = sqlite3.connect(tool.core.get_db_path())
-    tool.core.ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    if args.year and args.month:
-        cursor.execute(
-            "SELECT date, name, link FROM getchu_games WHERE substr(date, 1, 4) = ? AND CAST(substr(date, 6) AS INTEGER) = ? AND link IS NOT NULL AND link != ''",
-            (str(args.year), int(args.month)),
-        )
-    else:
-        cursor.execute(
-            "SELECT date, name, link FROM getchu_games WHERE link IS NOT NULL AND link != ''"
-        )
-    rows = cursor.fetchall()
-    conn.close()
-
-    status["total"] = len(rows)
-    write_json_atomic(status_path, status)
-
-    stop_event = threading.Event()
-
-    def _heartbeat():
-        while not stop_event.is_set():
-            try:
-                status["updated_at"] = now_ts()
-                write_json_atomic(status_path, status)
-            except Exception:
-                pass
-            stop_event.wait(3)
-
-    t = threading.Thread(target=_heartbeat, daemon=True)
-    t.start()
-
-    for date, name, link in rows:
-        try:
-            status["current"] = {"date": date, "name": name}
-            status["checked"] += 1
-            status["updated_at"] = now_ts()
-            write_json_atomic(status_path, status)
-            result, err = _check_magnet_exists_with_timeout(link, 60)
-            if err:
-                status["errors"].append(f"{date}/{name}: {err}")
-            elif isinstance(result, dict) and result.get("exists"):
-                tool.core.set_downloaded_status(date, name, 1, result.get("infohash_hex"))
-                status["found_downloaded"] += 1
-        except Exception as e:
-            status["errors"].append(f"{date}/{name}: {e}")
-
-        status["updated_at"] = now_ts()
-        write_json_atomic(status_path, status)
-
-    stop_event.set()
-    status["running"] = False
-    status["current"] = None
-    write_json_atomic(status_path, status)
-
-    _print({
-        "success": True,
-        "total": status["total"],
-        "checked": status["checked"],
-        "found_downloaded": status["found_downloaded"],
-        "errors": status["errors"][:10],
-    })
 
 
 def build_parser():
@@ -619,17 +487,27 @@ def build_parser():
     p_games.add_argument("--page", type=int, default=1)
     p_games.add_argument("--year", type=int)
     p_games.add_argument("--month", type=int)
+    p_games.add_argument("--cursor", type=str)
     p_games.set_defaults(func=cmd_games)
 
+    p_search = sub.add_parser("search")
+    p_search.add_argument("query")
+    p_search.add_argument("--page", type=int, default=1)
+    p_search.add_argument("--year", type=int)
+    p_search.add_argument("--month", type=int)
+    p_search.set_defaults(func=cmd_search)
+
     p_spider = sub.add_parser("spider")
     spider_sub = p_spider.add_subparsers(dest="action", required=True)
 
     p_spider_status = spider_sub.add_parser("status")
+    _add_wait_args(p_spider_status)
     p_spider_status.set_defaults(func=cmd_spider_status)
 
     p_spider_start = spider_sub.add_parser("start")
     p_spider_start.add_argument("--start-year", type=int, required=True)
     p_spider_start.add_argument("--end-year", type=int, required=True)
+    p_spider_start.add_argument("--no-cache", action="store_true")
     p_spider_start.set_defaults(func=cmd_spider_start)
 
     p_spider_stop = spider_sub.add_parser("stop")
@@ -639,11 +517,14 @@ def build_parser():
     download_sub = p_download.add_subparsers(dest="action", required=True)
 
     p_download_status = download_sub.add_parser("status")
+    _add_wait_args(p_download_status)
     p_download_status.set_defaults(func=cmd_download_status)
 
     p_download_start = download_sub.add_parser("start")
     p_download_start.add_argument("--year", type=int, required=True)
     p_download_start.add_argument("--month", type=int)
+    p_download_start.add_argument("--no-cache", action="store_true")
+    p_download_start.add_argument("--force", action="store_true")
     p_download_start.set_defaults(func=cmd_download_start)
 
     p_download_stop = download_sub.add_parser("stop")
@@ -675,6 +556,7 @@ def build_parser():
     p_115_check = _115_sub.add_parser("check")
     p_115_check.add_argument("--magnet", type=str, required=True)
     p_115_check.add_argument("--dir", type=str, default="")
+    p_115_check.add_argument("--local", action="store_true")
     p_115_check.set_defaults(func=cmd_115_check)
 
     p_115_submit = _115_sub.add_parser("submit")
@@ -688,18 +570,63 @@ def build_parser():
     p_115_check_all_start = check_all_sub.add_parser("start")
     p_115_check_all_start.add_argument("--year", type=int)
     p_115_check_all_start.add_argument("--month", type=int)
+    p_115_check_all_start.add_argument("--source", choices=["live", "local"])
     p_115_check_all_start.set_defaults(func=cmd_115_check_all_start)
 
     p_115_check_all_status = check_all_sub.add_parser("status")
+    _add_wait_args(p_115_check_all_status)
     p_115_check_all_status.set_defaults(func=cmd_115_check_all_status)
 
     p_115_check_all_stop = check_all_sub.add_parser("stop")
     p_115_check_all_stop.set_defaults(func=cmd_115_check_all_stop)
 
-    p_115_check_all_worker = check_all_sub.add_parser("worker")
-    p_115_check_all_worker.add_argument("--year", type=int)
-    p_115_check_all_worker.add_argument("--month", type=int)
-    p_115_check_all_worker.set_defaults(func=cmd_115_check_all_worker)
+    p_115_mirror = _115_sub.add_parser("mirror")
+    mirror_sub = p_115_mirror.add_subparsers(dest="mirror_action", required=True)
+
+    p_115_mirror_sync = mirror_sub.add_parser("sync")
+    p_115_mirror_sync.add_argument("--full", action="store_true")
+    p_115_mirror_sync.set_defaults(func=cmd_115_mirror_sync)
+
+    p_115_mirror_status = mirror_sub.add_parser("status")
+    p_115_mirror_status.set_defaults(func=cmd_115_mirror_status)
+
+    p_jobs = sub.add_parser("jobs")
+    jobs_sub = p_jobs.add_subparsers(dest="action", required=True)
+
+    p_jobs_enqueue = jobs_sub.add_parser("enqueue")
+    p_jobs_enqueue.add_argument("type", choices=["spider", "download", "check_all"])
+    p_jobs_enqueue.add_argument("--params", type=str, default="{}")
+    p_jobs_enqueue.add_argument("--priority", type=int, default=0)
+    p_jobs_enqueue.set_defaults(func=cmd_jobs_enqueue)
+
+    p_jobs_list = jobs_sub.add_parser("list")
+    p_jobs_list.add_argument("--state", choices=["queued", "running", "done", "failed", "cancelled"])
+    p_jobs_list.add_argument("--type", choices=["spider", "download", "check_all"])
+    p_jobs_list.add_argument("--limit", type=int, default=50)
+    p_jobs_list.set_defaults(func=cmd_jobs_list)
+
+    p_jobs_show = jobs_sub.add_parser("show")
+    p_jobs_show.add_argument("job_id", type=int)
+    p_jobs_show.set_defaults(func=cmd_jobs_show)
+
+    p_jobs_cancel = jobs_sub.add_parser("cancel")
+    p_jobs_cancel.add_argument("job_id", type=int)
+    p_jobs_cancel.set_defaults(func=cmd_jobs_cancel)
+
+    p_jobs_retry = jobs_sub.add_parser("retry")
+    p_jobs_retry.add_argument("job_id", type=int)
+    p_jobs_retry.set_defaults(func=cmd_jobs_retry)
+
+    p_nyaa_index = sub.add_parser("nyaa_index")
+    nyaa_index_sub = p_nyaa_index.add_subparsers(dest="action", required=True)
+
+    p_nyaa_index_sync = nyaa_index_sub.add_parser("sync")
+    p_nyaa_index_sync.add_argument("--full", action="store_true")
+    p_nyaa_index_sync.add_argument("--max-pages", type=int)
+    p_nyaa_index_sync.set_defaults(func=cmd_nyaa_index_sync)
+
+    p_nyaa_index_status = nyaa_index_sub.add_parser("status")
+    p_nyaa_index_status.set_defaults(func=cmd_nyaa_index_status)
 
     p_update = sub.add_parser("update_game")
     p_update.add_argument("--date", type=str, required=True)
@@ -717,9 +644,34 @@ def build_parser():
     p_delete.add_argument("--name", type=str, required=True)
     p_delete.set_defaults(func=cmd_delete_game)
 
+    p_candidates = sub.add_parser("candidates")
+    p_candidates.add_argument("--date", type=str, required=True)
+    p_candidates.add_argument("--name", type=str, required=True)
+    p_candidates.set_defaults(func=cmd_candidates)
+
+    p_reselect = sub.add_parser("reselect")
+    p_reselect.add_argument("--year", type=int)
+    p_reselect.add_argument("--month", type=int)
+    p_reselect.add_argument("--include-downloaded", action="store_true")
+    p_reselect.add_argument("--dry-run", action="store_true")
+    p_reselect.set_defaults(func=cmd_reselect)
+
     return parser
 
 
+def run_command(argv):
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit:
+        raise ValueError("参数错误: " + " ".join(argv))
+    _output.sink = []
+    try:
+        args.func(args)
+        return _output.sink
+    finally:
+        _output.sink = None
+
+
 def main():
     parser = build_parser()
     args = parser.parse_args()
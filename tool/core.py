@@ -1,79 +1,100 @@
 import json
 import logging
 import re
-import sqlite3
 import time
+import concurrent.futures as cf
 from datetime import datetime
 
 import requests
-from bs4 import BeautifulSoup
 
-from .models import GetchuGame, NyaaData
-from .runtime import read_config, runtime_paths
+from . import http_cache, ratelimit
+from .db import connect, ensure_getchu_schema
+from .matcher import KeywordMatcher, matcher_for
+from .models import GetchuGame
+from .parsers import extract_getchu_rows, extract_nyaa_rows, parse_getchu_row, parse_nyaa_row
+from .queries import (
+    bulk_insert_games,
+    delete_game_record,
+    get_db_path,
+    get_games_data,
+    get_latest_month,
+    get_years_list,
+    load_candidates,
+    query_games_page,
+    save_candidates,
+    search_games,
+    set_downloaded_status,
+    update_game_record,
+)
+from .runtime import runtime_context
+from .scoring import get_scorer
 
 
 logger = logging.getLogger(__name__)
 
+NYAA_HOST = "sukebei.nyaa.si"
+DOWNLOAD_BATCH_SIZE = 10
+
+# (发售后天数上限, 首次重查间隔, 最大重查间隔)，未命中次数越多间隔翻倍，直到最大间隔
+LOOKUP_SCHEDULE = (
+    (90, 12 * 3600, 2 * 86400),
+    (365, 86400, 14 * 86400),
+    (None, 7 * 86400, 180 * 86400),
+)
+
 
 def clear_link(nyaa_data):
     nyaa_data.link = None
     return nyaa_data
 
 
+_SPACES_RE = re.compile(r"\s+")
+
+
 def normalize_name(name, delete_list):
     if not name:
         return ""
-    for del_str in delete_list:
-        if del_str and del_str in name:
-            name = name.replace(del_str, " ")
-    name = re.sub(r"\s+", " ", name).strip()
-    return name
+    delete = delete_list if isinstance(delete_list, KeywordMatcher) else matcher_for(delete_list)
+    return _SPACES_RE.sub(" ", delete.sub(" ", name)).strip()
 
 
-def get_raw_getchu_games(year, month):
-    config = read_config()
-    skip_list = config.get("skip", [])
+def get_raw_getchu_games(year, month, context=None):
+    skip = (context or runtime_context()).skip_matcher
 
     cookies = {"getchu_adalt_flag": "getchu.com"}
     url = f"https://www.getchu.com/all/price.html?genre=pc_soft&year={year}&month={month}"
     try:
-        response = requests.get(url, cookies=cookies)
+        response = http_cache.cached_get(url, cookies=cookies)
         response.raise_for_status()
     except Exception as e:
         logger.error("获取%s年%s月数据时出错: %s", year, month, str(e))
-        return []
-
-    soup = BeautifulSoup(response.text, "html.parser")
-    if not soup:
-        logger.error("解析%s年%s月HTML内容失败", year, month)
-        return []
+        # None 表示抓取失败，与当月确实没有游戏的空列表区分
+        return None
 
-    game_rows = soup.find_all("tr", bgcolor="#ffffff")
+    game_rows = extract_getchu_rows(response.text)
     if not game_rows:
+        http_cache.mark_negative(url)
         logger.warning("%s年%s月没有找到游戏数据", year, month)
         return []
 
     raw_games = []
+    date = f"{year}-{month:02d}"
     for row in game_rows:
-        columns = row.find_all("td")
-        if len(columns) >= 3:
-            date = f"{year}-{month:02d}"
-            name = columns[1].text.strip()
-            company = columns[2].text.strip()
-            if company and name and not any(skip_str in name for skip_str in skip_list):
-                raw_games.append(GetchuGame(date, name, company))
+        cols = parse_getchu_row(row)
+        if cols is None:
+            continue
+        name, company = cols
+        if company and name and not skip.search(name):
+            raw_games.append(GetchuGame(date, name, company))
 
     return raw_games
 
 
-def deduplicate_games(raw_games):
-    config = read_config()
-    combined_list = sorted(config.get("delete", []), key=len, reverse=True)
+def deduplicate_games(raw_games, context=None):
+    delete = (context or runtime_context()).delete_matcher
 
     for game in raw_games:
-        for del_str in combined_list:
-            if del_str in game.name:
-                game.name = game.name.replace(del_str, "").strip()
+        game.name = delete.sub("", game.name, strip=True)
 
     raw_games.sort(key=lambda x: (x.company, len(x.name)))
 
@@ -81,7 +102,7 @@ def deduplicate_games(raw_games):
     processed_keys = set()
 
     for game in raw_games:
-        key = normalize_name(game.name, combined_list)
+        key = normalize_name(game.name, delete)
         stripped_key = key.rsplit(" ", 1)[0] if " " in key else key
         if key in processed_keys or stripped_key in processed_keys:
             continue
@@ -93,108 +114,17 @@ def deduplicate_games(raw_games):
 
 
 def get_getchu_games(year, month):
-    raw_games = get_raw_getchu_games(year, month)
-    return deduplicate_games(raw_games)
-
-
-def get_db_path(default=None):
-    paths = runtime_paths()
-    return paths["db_path"] if paths.get("db_path") else default
-
-
-def ensure_getchu_schema(conn):
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS getchu_games (
-            date TEXT,
-            name TEXT,
-            company TEXT,
-            size TEXT,
-            link TEXT,
-            nyaa_name TEXT,
-            comment TEXT,
-            downloaded INTEGER DEFAULT 0,
-            infohash_hex TEXT,
-            PRIMARY KEY (date, name)
-        )
-        """
-    )
-    cursor.execute("PRAGMA table_info(getchu_games)")
-    cols = {row[1] for row in cursor.fetchall()}
-    if "nyaa_name" not in cols:
-        cursor.execute("ALTER TABLE getchu_games ADD COLUMN nyaa_name TEXT")
-    if "downloaded" not in cols:
-        cursor.execute("ALTER TABLE getchu_games ADD COLUMN downloaded INTEGER DEFAULT 0")
-    if "infohash_hex" not in cols:
-        cursor.execute("ALTER TABLE getchu_games ADD COLUMN infohash_hex TEXT")
-    conn.commit()
-
-
-def set_downloaded_status(date, name, downloaded=1, infohash_hex=None, db_path=None):
-    conn = sqlite3.connect(db_path or get_db_path())
-    ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    if infohash_hex:
-        cursor.execute(
-            "UPDATE getchu_games SET downloaded = ?, infohash_hex = ? WHERE date = ? AND name = ?",
-            (downloaded, infohash_hex, date, name),
-        )
-    else:
-        cursor.execute(
-            "UPDATE getchu_games SET downloaded = ? WHERE date = ? AND name = ?",
-            (downloaded, date, name),
-        )
-    conn.commit()
-    conn.close()
-
-
-def update_game_record(date, name, new_date=None, new_name=None, new_company=None, new_link=None, new_downloaded=None, new_nyaa_name=None, db_path=None):
-    conn = sqlite3.connect(db_path or get_db_path())
-    ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    fields = {}
-    if new_date is not None and new_date != date:
-        fields["date"] = new_date
-    if new_name is not None:
-        fields["name"] = new_name
-    if new_company is not None:
-        fields["company"] = new_company
-    if new_link is not None:
-        fields["link"] = new_link
-    if new_downloaded is not None:
-        fields["downloaded"] = 1 if new_downloaded else 0
-    if new_nyaa_name is not None:
-        fields["nyaa_name"] = new_nyaa_name
-    if not fields:
-        conn.close()
-        return False
-    sets = ", ".join(f"{k} = ?" for k in fields)
-    values = list(fields.values()) + [date, name]
-    cursor.execute(f"UPDATE getchu_games SET {sets} WHERE date = ? AND name = ?", values)
-    affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return affected > 0
-
-
-def delete_game_record(date, name, db_path=None):
-    conn = sqlite3.connect(db_path or get_db_path())
-    ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM getchu_games WHERE date = ? AND name = ?", (date, name))
-    affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return affected > 0
+    context = runtime_context()
+    raw_games = get_raw_getchu_games(year, month, context)
+    if raw_games is None:
+        return None
+    return deduplicate_games(raw_games, context)
 
 
 def get_all_getchu_games(start_year, end_year, start_month, end_month, db_path=None):
     logger.info("开始获取%s年%s月至%s年%s月的数据", start_year, start_month, end_year, end_month)
+    conn = connect(db_path)
     try:
-        conn = sqlite3.connect(db_path or get_db_path())
-        ensure_getchu_schema(conn)
-        cursor = conn.cursor()
         success_count = 0
         for year in range(start_year, end_year + 1):
             for month in range(start_month, end_month + 1):
@@ -203,196 +133,348 @@ def get_all_getchu_games(start_year, end_year, start_month, end_month, db_path=N
                 if not games:
                     logger.warning("%s年%s月没有获取到数据", year, month)
                     continue
-                for game in games:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO getchu_games (date, name, company) VALUES (?,?,?)",
-                        (game.date, game.name, game.company),
-                    )
+                inserted, skipped = bulk_insert_games(conn, games)
                 success_count += len(games)
-                logger.info("完成%s年%s月的数据处理，共处理%s个游戏", year, month, len(games))
+                logger.info("完成%s年%s月的数据处理，共处理%s个游戏，新增%s，跳过%s", year, month, len(games), inserted, skipped)
         conn.commit()
-        conn.close()
         return success_count > 0
     except Exception as e:
+        conn.rollback()
         logger.error("get_all_getchu_games,数据库操作失败: %s", str(e))
         return False
 
 
 def get_nyaa_data(game_name, company):
     game_name = re.sub(r"[-]", "", game_name)
+    url = f"https://{NYAA_HOST}/?f=0&c=1_3&q={game_name}+{company}"
     try:
-        response = requests.get(f"https://sukebei.nyaa.si/?f=0&c=1_3&q={game_name}+{company}")
+        response = http_cache.cached_get(url)
         response.raise_for_status()
-    except (requests.exceptions.ConnectTimeout, requests.exceptions.RetryError) as e:
-        logger.error("获取游戏 %s 数据时连接超时或重试次数过多: %s", game_name, str(e))
-        return []
+    except requests.exceptions.RequestException as e:
+        # None 表示查询失败，与确实没有搜索结果的空列表区分
+        logger.error("获取游戏 %s 数据时请求失败: %s", game_name, str(e))
+        return None
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    rows = soup.find_all("tr")
+    rows = extract_nyaa_rows(response.text)
     if not rows:
+        http_cache.mark_negative(url)
         keyword = re.sub(r"[^\w\s]", "", game_name)
         keyword2 = re.sub(r"[-]", " ", company)
+        url = f"https://{NYAA_HOST}/?f=0&c=1_3&q={keyword}+{keyword2}"
         try:
-            response = requests.get(f"https://sukebei.nyaa.si/?f=0&c=1_3&q={keyword}+{keyword2}")
+            response = http_cache.cached_get(url)
             response.raise_for_status()
-        except (requests.exceptions.ConnectTimeout, requests.exceptions.RetryError) as e:
-            logger.error("使用关键词 %s 获取游戏 %s 数据时连接超时或重试次数过多: %s", keyword, game_name, str(e))
-            return []
-        soup = BeautifulSoup(response.text, "html.parser")
-        rows = soup.find_all("tr")
+        except requests.exceptions.RequestException as e:
+            logger.error("使用关键词 %s 获取游戏 %s 数据时请求失败: %s", keyword, game_name, str(e))
+            return None
+        rows = extract_nyaa_rows(response.text)
+        if not rows:
+            http_cache.mark_negative(url)
 
     nyaa_data_list = []
     for row in rows:
-        cells = row.find_all("td")
-        if len(cells) >= 5:
-            link_views = cells[1].select('a[href*="view"]')
-            name_element = link_views[-1] if len(link_views) > 0 else None
-            name = name_element.attrs["title"] if name_element else cells[1].get_text(strip=True)
-
-            link_element = next(
-                (a for a in cells[2].select("a[href]") if "magnet:?xt=urn:btih:" in a.attrs["href"]),
-                None,
-            )
-            link = link_element.attrs["href"] if link_element else ""
-
-            size = cells[3].get_text(strip=True)
-            date_str = cells[4].get_text(strip=True)
-            try:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-                date_str_formatted = date_obj.strftime("%Y-%m-%d %H:%M")
-            except ValueError:
-                date_str_formatted = None
-
-            nyaa_data_list.append(NyaaData(date_str_formatted, size, name, link))
+        nyaa_data = parse_nyaa_row(row)
+        if nyaa_data is not None:
+            nyaa_data_list.append(nyaa_data)
 
     nyaa_data_list.sort(key=lambda x: x.date if x.date else datetime.min, reverse=True)
     return nyaa_data_list
 
 
-def download_games_by_month(year, month):
+def configure_nyaa_rate(rate, burst=1):
+    ratelimit.configure_host(NYAA_HOST, rate, burst, shared=True)
+
+
+def _nyaa_fetcher(source, conn):
+    if source == "local":
+        from .nyaa_index import get_nyaa_data_local
+
+        return lambda game_name, company: get_nyaa_data_local(game_name, company, conn)
+    return get_nyaa_data
+
+
+def _fetch_or_none(fetch, game):
+    # 单个游戏的请求异常只记为查询失败，不中断整个月份
+    try:
+        return fetch(game[1], game[2])
+    except requests.exceptions.RequestException as e:
+        logger.error("获取游戏 %s 数据时请求失败: %s", game[1], str(e))
+        return None
+
+
+def lookup_nyaa_concurrently(games, max_workers=1, fetch=get_nyaa_data):
+    max_workers = max(1, int(max_workers or 1))
+    if max_workers == 1:
+        for game in games:
+            yield game, _fetch_or_none(fetch, game)
+        return
+
+    ex = cf.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nyaa")
+    try:
+        futures = {ex.submit(_fetch_or_none, fetch, game): game for game in games}
+        for fut in cf.as_completed(futures):
+            yield futures[fut], fut.result()
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def _select_nyaa_data(nyaa_data_list, game_name, year, month, scorer=None):
+    scorer = scorer or get_scorer()
+    selected_data, score, accepted = scorer.select(nyaa_data_list, game_name, year, month)
+    if selected_data is not None and not accepted:
+        selected_data = clear_link(selected_data)
+        logger.warning("未找到可信的下载链接(最高分%.1f)，记录最高分数据: %s", score, selected_data.name)
+    return selected_data
+
+
+def game_key(date, name):
+    return f"{date}|{name}"
+
+
+def lookup_interval(date, attempts, now=None):
+    now = now or time.time()
+    try:
+        year, month = date.split("-")[:2]
+        released = datetime(int(year), int(month), 1).timestamp()
+    except (AttributeError, ValueError):
+        released = now
+    age_days = (now - released) / 86400
+    for max_age, base, cap in LOOKUP_SCHEDULE:
+        if max_age is None or age_days <= max_age:
+            break
+    return min(base * 2 ** max(int(attempts or 0) - 1, 0), cap)
+
+
+def lookup_due(date, attempts, last_checked_at, now=None):
+    if not last_checked_at or not attempts:
+        return True
+    now = now or time.time()
+    return now - last_checked_at >= lookup_interval(date, attempts, now)
+
+
+def split_due_games(games, force=False, now=None):
+    if force:
+        return list(games), 0
+    now = now or time.time()
+    due = [game for game in games if lookup_due(game[0], game[3], game[4], now)]
+    return due, len(games) - len(due)
+
+
+def _store_lookup(cursor, game, nyaa_data_list, year, month, scorer, checked_at):
+    game_date = game[0]
+    game_name = game[1]
+    result = "miss"
+
+    if nyaa_data_list is None:
+        # 请求失败不计入退避：保留原有链接与查询次数，下次任务直接重查
+        cursor.execute(
+            "UPDATE getchu_games SET last_result = 'error' WHERE date = ? AND name = ?",
+            (game_date, game_name),
+        )
+        return "error"
+
+    if nyaa_data_list:
+        save_candidates(cursor.connection, game_date, game_name, nyaa_data_list, checked_at)
+        selected_data = _select_nyaa_data(nyaa_data_list, game_name, year, month, scorer)
+
+        if selected_data:
+            cursor.execute(
+                "UPDATE getchu_games SET size = ?, link = ?, nyaa_name = ? WHERE date = ? AND name = ?",
+                (selected_data.size, selected_data.link, selected_data.name, game_date, game_name),
+            )
+            result = "found" if selected_data.link else "partial"
+        else:
+            cursor.execute(
+                """
+                UPDATE getchu_games
+                SET size = NULL, link = NULL, nyaa_name = NULL, comment = NULL
+                WHERE date = ? AND name = ?
+                """,
+                (game_date, game_name),
+            )
+
+    cursor.execute(
+        "UPDATE getchu_games SET last_checked_at = ?, attempts = attempts + 1, last_result = ? WHERE date = ? AND name = ?",
+        (checked_at, result, game_date, game_name),
+    )
+    return result
+
+
+def download_games_by_month(
+    year,
+    month,
+    concurrency=1,
+    rate=None,
+    burst=1,
+    source="live",
+    skip=None,
+    force=False,
+    on_result=None,
+    on_commit=None,
+    should_stop=None,
+    batch_size=DOWNLOAD_BATCH_SIZE,
+):
+    conn = connect()
     try:
         logger.info("开始获取%s年%s月的游戏下载链接", year, month)
+        if rate is not None:
+            configure_nyaa_rate(rate, burst)
 
-        conn = sqlite3.connect(get_db_path())
-        ensure_getchu_schema(conn)
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM getchu_games WHERE date LIKE ?", (f"{year}-{month:02d}",))
+        cursor.execute("SELECT COUNT(*) FROM getchu_games WHERE year = ? AND month = ?", (year, month))
         total_count = int(cursor.fetchone()[0] or 0)
         if total_count <= 0:
             logger.info("%s年%s月没有游戏数据，跳过", year, month)
-            conn.close()
             return True
 
         cursor.execute(
-            "SELECT * FROM getchu_games WHERE date LIKE ? AND (link IS NULL OR link = '')",
-            (f"{year}-{month:02d}",),
+            """
+            SELECT date, name, company, attempts, last_checked_at FROM getchu_games
+            WHERE year = ? AND month = ? AND (link IS NULL OR link = '')
+            """,
+            (year, month),
         )
         games = cursor.fetchall()
+        if skip:
+            games = [game for game in games if game_key(game[0], game[1]) not in skip]
 
         if not games:
             logger.info("%s年%s月所有游戏都已有下载链接，跳过", year, month)
-            conn.close()
             return True
 
-        success_count = 0
-        for game in games:
-            game_date = game[0]
-            game_name = game[1]
-            company = game[2]
-            nyaa_data_list = get_nyaa_data(game_name, company)
-
-            if nyaa_data_list:
-                current_month = f"{str(year)[-2:]}{month:02d}"
-                selected_data = next(
-                    (d for d in nyaa_data_list if "girlcelly" in d.name and current_month in d.name),
-                    next(
-                        (d for d in nyaa_data_list if "2D.G.F." in d.name and current_month in d.name),
-                        next((d for d in nyaa_data_list if current_month in d.name), None),
-                    ),
-                )
+        games, scheduled = split_due_games(games, force)
+        if scheduled:
+            logger.info("%s年%s月有%s个游戏未到重查时间，跳过", year, month, scheduled)
+        if not games:
+            return True
 
-                if selected_data is None and nyaa_data_list:
-                    selected_data = clear_link(nyaa_data_list[0])
-                    logger.warning(
-                        "未找到包含%s的下载链接，记录第一条数据: %s", current_month, selected_data.name
-                    )
+        if source == "local":
+            concurrency = 1
+        fetch = _nyaa_fetcher(source, conn)
+        scorer = get_scorer()
 
-                if selected_data:
-                    cursor.execute(
-                        "UPDATE getchu_games SET size = ?, link = ?, nyaa_name = ? WHERE date = ? AND name = ?",
-                        (selected_data.size, selected_data.link, selected_data.name, game_date, game_name),
-                    )
+        success_count = 0
+        results = []
+
+        def _flush():
+            # 网络查询期间不持有写事务，每批结果在一个短事务中写入
+            nonlocal success_count
+            if not results:
+                return
+            for game, nyaa_data_list, checked_at in results:
+                result = _store_lookup(cursor, game, nyaa_data_list, year, month, scorer, checked_at)
+                if result in ("found", "partial"):
                     success_count += 1
-                else:
-                    cursor.execute(
-                        """
-                        UPDATE getchu_games
-                        SET size = NULL, link = NULL, nyaa_name = NULL, comment = NULL
-                        WHERE date = ? AND name = ?
-                        """,
-                        (game_date, game_name),
-                    )
-            time.sleep(2)
+                if on_result:
+                    on_result(conn, game, result)
+            conn.commit()
+            if on_commit:
+                on_commit(len(results))
+            results.clear()
 
-        conn.commit()
-        conn.close()
+        try:
+            for game, nyaa_data_list in lookup_nyaa_concurrently(games, concurrency, fetch):
+                results.append((game, nyaa_data_list, int(time.time())))
+                if len(results) >= batch_size:
+                    _flush()
+                if should_stop and should_stop():
+                    logger.info("%s年%s月的下载链接获取被中断", year, month)
+                    break
+        except Exception:
+            _flush()
+            raise
+        _flush()
 
         logger.info("成功更新%s年%s月%s个游戏的下载链接", year, month, success_count)
         return True
     except Exception as e:
+        conn.rollback()
         logger.error("获取%s年%s月游戏下载链接时出错: %s", year, month, str(e))
         return False
 
 
-def get_years_list():
-    conn = sqlite3.connect(get_db_path())
-    ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT substr(date, 1, 4) FROM getchu_games ORDER BY date DESC")
-    years = [int(row[0]) for row in cursor.fetchall()]
-    conn.close()
-    return years
+def reselect_games(year=None, month=None, include_downloaded=False, dry_run=False):
+    conn = connect()
+    where = ["EXISTS (SELECT 1 FROM nyaa_candidates c WHERE c.game_date = g.date AND c.game_name = g.name)"]
+    params = []
+    if year:
+        where.append("g.year = ?")
+        params.append(int(year))
+    if month:
+        where.append("g.month = ?")
+        params.append(int(month))
+    if not include_downloaded:
+        where.append("COALESCE(g.downloaded, 0) = 0")
+    rows = conn.execute(
+        f"SELECT g.date, g.name, g.link, g.nyaa_name FROM getchu_games g WHERE {' AND '.join(where)} ORDER BY g.date, g.name",
+        params,
+    ).fetchall()
+
+    scorer = get_scorer()
+    changes = []
+    try:
+        for game_date, game_name, link, nyaa_name in rows:
+            game_year, game_month = map(int, game_date.split("-")[:2])
+            selected_data = _select_nyaa_data(
+                load_candidates(conn, game_date, game_name), game_name, game_year, game_month, scorer
+            )
+            if selected_data is None:
+                continue
+            if (selected_data.link or None) == (link or None) and selected_data.name == nyaa_name:
+                continue
+            changes.append(
+                {
+                    "date": game_date,
+                    "name": game_name,
+                    "old_nyaa_name": nyaa_name,
+                    "new_nyaa_name": selected_data.name,
+                    "old_link": link,
+                    "new_link": selected_data.link or None,
+                }
+            )
+            if not dry_run:
+                conn.execute(
+                    "UPDATE getchu_games SET size = ?, link = ?, nyaa_name = ? WHERE date = ? AND name = ?",
+                    (selected_data.size, selected_data.link or None, selected_data.name, game_date, game_name),
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    logger.info("重新选择下载链接完成，检查%s个游戏，变更%s个", len(rows), len(changes))
+    return {"checked": len(rows), "changed": len(changes), "dry_run": dry_run, "changes": changes}
 
 
-def get_download_link(year=None, month=None):
+def get_download_link(year=None, month=None, source="live"):
     logger.info("开始获取下载链接")
-    conn = sqlite3.connect(get_db_path())
-    ensure_getchu_schema(conn)
+    conn = connect()
     cursor = conn.cursor()
+    fetch = _nyaa_fetcher(source, conn)
 
     if year and month:
-        cursor.execute("SELECT * FROM getchu_games WHERE date = ?", f"{year}-{month:02d}")
+        cursor.execute("SELECT date, name, company FROM getchu_games WHERE year = ? AND month = ?", (year, month))
     else:
-        cursor.execute("SELECT * FROM getchu_games")
+        cursor.execute("SELECT date, name, company FROM getchu_games")
 
     games = cursor.fetchall()
+    scorer = get_scorer()
     for index, game in enumerate(games):
         game_date = game[0]
         game_name = game[1]
-        nyaa_data_list = get_nyaa_data(game_name)
-        yymm_format = game_date.replace("-", "")[2:]
-        current_list = [data for data in nyaa_data_list if yymm_format in data.name]
-        current_list.sort(key=lambda x: yymm_format in x.name, reverse=True)
-        if current_list:
-            nyaa_data_list = current_list
-        selected_data = None
+        nyaa_data_list = fetch(game_name, game[2])
         if nyaa_data_list:
-            for data in nyaa_data_list:
-                if "girlcelly" in data.name:
-                    selected_data = data
-                    break
-            else:
-                selected_data = nyaa_data_list[0]
+            try:
+                game_date_dt = datetime.strptime(game_date, "%Y-%m")
+            except ValueError:
+                logger.warning("无效的日期格式: %s", game_date)
+                continue
+            selected_data = _select_nyaa_data(nyaa_data_list, game_name, game_date_dt.year, game_date_dt.month, scorer)
             if selected_data:
                 try:
                     selected_data_date = datetime.strptime(selected_data.date, "%Y-%m-%d %H:%M")
                 except (ValueError, TypeError):
                     selected_data_date = None
-                try:
-                    game_date_dt = datetime.strptime(game_date, "%Y-%m")
-                except ValueError:
-                    logger.warning("无效的日期格式: %s", game_date)
-                    continue
                 if selected_data_date and selected_data_date < game_date_dt:
                     cursor.execute(
                         "UPDATE getchu_games SET comment = ? WHERE date = ? AND name = ?",
@@ -400,52 +482,14 @@ def get_download_link(year=None, month=None):
                     )
                 cursor.execute(
                     "UPDATE getchu_games SET size = ?, link = ? WHERE date = ? AND name = ?",
-                    (str(selected_data.size), str(selected_data.link), game[0], game[1]),
+                    (str(selected_data.size), selected_data.link or None, game[0], game[1]),
                 )
                 conn.commit()
                 logger.info("已更新游戏 %s 的下载链接和大小信息，当前进度: %s/%s", game_name, index + 1, len(games))
-        time.sleep(2)
-    conn.close()
+        if source != "local":
+            time.sleep(2)
 
     if year and month:
         logger.info("已完成%s年%s月的下载链接获取", year, month)
     else:
         logger.info("已完成所有下载链接获取")
-
-
-def get_games_data():
-    conn = sqlite3.connect(get_db_path())
-    ensure_getchu_schema(conn)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT
-            substr(date, 1, 4) as year,
-            substr(date, 6, 2) as month,
-            name,
-            company,
-            link as download_url,
-            nyaa_name,
-            comment,
-            COALESCE(downloaded, 0) as downloaded,
-            infohash_hex
-        FROM getchu_games
-        ORDER BY year DESC, month DESC
-        """
-    )
-    games = [
-        GetchuGame(
-            f"{row[0]}-{row[1]}",
-            row[2],
-            row[3],
-            None,
-            row[4],
-            row[5],
-            row[6],
-            row[7],
-            row[8],
-        )
-        for row in cursor.fetchall()
-    ]
-    conn.close()
-    return games
@@ -0,0 +1,262 @@
+import argparse
+import concurrent.futures as cf
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from tool.runtime import ensure_parent_dir, repo_root, runtime_paths
+
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 2
+CALL_TIMEOUT = 120
+WAIT_WORKERS = 16
+
+
+def _error(req_id, code, message):
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+def _dispatch(server, request):
+    req_id = request.get("id") if isinstance(request, dict) else None
+    if not isinstance(request, dict):
+        return _error(None, -32600, "无效请求")
+
+    method = request.get("method")
+    params = request.get("params") or []
+    if method == "ping":
+        return {"jsonrpc": "2.0", "id": req_id, "result": {"pid": os.getpid(), "started_at": server.started_at}}
+    if method == "shutdown":
+        threading.Thread(target=server.shutdown, daemon=True).start()
+        return {"jsonrpc": "2.0", "id": req_id, "result": {"status": "success"}}
+    if method != "run":
+        return _error(req_id, -32601, f"未知方法: {method}")
+    if not isinstance(params, list) or not all(isinstance(p, str) for p in params):
+        return _error(req_id, -32602, "params 必须是字符串数组")
+
+    from tool import cli
+
+    try:
+        outputs = cli.run_command(params)
+    except ValueError as e:
+        return _error(req_id, -32602, str(e))
+    except Exception as e:
+        logger.exception("守护进程执行命令失败: %s", params)
+        return _error(req_id, -32000, str(e))
+    result = outputs[0] if len(outputs) == 1 else (outputs or None)
+    return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = _error(None, -32700, "JSON解析失败")
+            else:
+                response = self.server.submit(request).result()
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers, wait_workers=WAIT_WORKERS):
+        self.executor = cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="daemon")
+        # 长轮询单独使用一组线程，避免占满普通命令的线程
+        self.wait_executor = cf.ThreadPoolExecutor(max_workers=wait_workers, thread_name_prefix="daemon-wait")
+        self._wait_slots = threading.BoundedSemaphore(wait_workers)
+        self.started_at = int(time.time())
+        super().__init__(socket_path, _Handler)
+
+    def submit(self, request):
+        params = request.get("params") if isinstance(request, dict) else None
+        if isinstance(params, list) and request.get("method") == "run" and "--wait" in params:
+            if self._wait_slots.acquire(blocking=False):
+                future = self.wait_executor.submit(_dispatch, self, request)
+                future.add_done_callback(lambda f: self._wait_slots.release())
+                return future
+            # 长轮询线程已满时立即返回当前状态，由客户端稍后再次请求
+            request = dict(request, params=[p for p in params if p != "--wait"])
+        return self.executor.submit(_dispatch, self, request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+        self.wait_executor.shutdown(wait=False)
+
+
+def _socket_in_use(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(socket_path=None, workers=None):
+    paths = runtime_paths()
+    socket_path = socket_path or paths["daemon_socket_path"]
+    workers = max(1, int(workers or paths["config"].get("daemon_workers", 4)))
+    wait_workers = max(1, int(paths["config"].get("daemon_wait_workers", WAIT_WORKERS)))
+
+    os.environ["HOME"] = repo_root()
+    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
+    logging.basicConfig(
+        filename=paths["log_path"],
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    ensure_parent_dir(socket_path)
+    if os.path.exists(socket_path):
+        if _socket_in_use(socket_path):
+            raise SystemExit(f"守护进程已在运行: {socket_path}")
+        os.remove(socket_path)
+
+    server = DaemonServer(socket_path, workers, wait_workers)
+    os.chmod(socket_path, 0o660)
+
+    def _handle_stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+
+    logger.info("守护进程已启动: %s (pid=%s)", socket_path, os.getpid())
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+        logger.info("守护进程已退出")
+
+
+def call(method, params=None, socket_path=None, timeout=CALL_TIMEOUT):
+    socket_path = socket_path or runtime_paths()["daemon_socket_path"]
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        sock.settimeout(timeout)
+        request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}
+        sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise ConnectionError("守护进程未返回数据")
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(response["error"].get("message"))
+    return response.get("result")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _summary(samples):
+    return {
+        "n": len(samples),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def bench(argv, n=50, socket_path=None):
+    cli_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    env = dict(os.environ, HOME=repo_root())
+
+    spawn = []
+    spawn_output = None
+    for _ in range(n):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, cli_path] + argv, cwd=repo_root(), env=env, capture_output=True)
+        spawn.append(time.perf_counter() - started)
+        spawn_output = proc.stdout
+
+    daemon = []
+    daemon_output = None
+    for _ in range(n):
+        started = time.perf_counter()
+        daemon_output = call("run", argv, socket_path)
+        daemon.append(time.perf_counter() - started)
+
+    try:
+        identical = json.loads(spawn_output) == daemon_output
+    except ValueError:
+        identical = False
+    return {"command": argv, "spawn": _summary(spawn), "daemon": _summary(daemon), "identical_output": identical}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--workers", type=int)
+
+    p_call = sub.add_parser("call")
+    p_call.add_argument("argv", nargs=argparse.REMAINDER)
+
+    sub.add_parser("ping")
+    sub.add_parser("stop")
+
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("-n", type=int, default=50)
+    p_bench.add_argument("argv", nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+    argv = list(getattr(args, "argv", None) or [])
+    if argv and argv[0] == "--":
+        argv = argv[1:]
+
+    if args.mode == "serve":
+        serve(args.socket, args.workers)
+        return
+
+    try:
+        if args.mode == "call":
+            result = call("run", argv, args.socket)
+        elif args.mode == "ping":
+            result = call("ping", None, args.socket)
+        elif args.mode == "stop":
+            result = call("shutdown", None, args.socket)
+        else:
+            result = bench(argv or ["games"], args.n, args.socket)
+    except (OSError, RuntimeError, ValueError) as e:
+        sys.stdout.write(json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False) + "\n")
+        sys.exit(1)
+    sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -570,6 +570,26 @@ document.getElementById('toggle-select').addEventListener('click', () => {
 document.getElementById('batch-115-download').addEventListener('click', batch115Download);
 
 let checkAllIntervalId = null;
+let checkAllSince = 0;
+
+function startWatch(update) {
+    const watch = { active: true };
+    (async () => {
+        while (watch.active) {
+            const started = Date.now();
+            await update(true);
+            const elapsed = Date.now() - started;
+            if (watch.active && elapsed < 1000) {
+                await new Promise(resolve => setTimeout(resolve, 1000 - elapsed));
+            }
+        }
+    })();
+    return watch;
+}
+
+function stopWatch(watch) {
+    if (watch) watch.active = false;
+}
 
 document.getElementById('batch-115-check').addEventListener('click', function() {
     const btn = this;
@@ -579,7 +599,7 @@ document.getElementById('batch-115-check').addEventListener('click', function()
     btn.textContent = '启动中...';
 
     if (checkAllIntervalId) {
-        clearInterval(checkAllIntervalId);
+        stopWatch(checkAllIntervalId);
         checkAllIntervalId = null;
     }
 
@@ -611,7 +631,7 @@ document.getElementById('batch-115-check').addEventListener('click', function()
             document.getElementById('check-progress-bar').setAttribute('aria-valuenow', '0');
             document.getElementById('check-progress-count').textContent = '';
 
-            checkAllIntervalId = setInterval(pollCheckAllStatus, 3000);
+            checkAllIntervalId = startWatch(pollCheckAllStatus);
         })
         .catch(err => {
             alert('启动校验失败: ' + err.message);
@@ -620,10 +640,12 @@ document.getElementById('batch-115-check').addEventListener('click', function()
         });
 });
 
-function pollCheckAllStatus() {
-    fetch(`${basePath}/tool/api.php?action=115_check_all_status`)
+function pollCheckAllStatus(wait = false) {
+    const waitQuery = wait ? `&wait=1&since=${checkAllSince}` : '';
+    return fetch(`${basePath}/tool/api.php?action=115_check_all_status${waitQuery}`)
         .then(r => r.json())
         .then(status => {
+            checkAllSince = status.revision || checkAllSince;
             if (status.running) {
                 const progress = status.total > 0 ? Math.round(status.checked / status.total * 100) : 0;
                 document.getElementById('check-progress-text').textContent =
@@ -633,7 +655,7 @@ function pollCheckAllStatus() {
                 document.getElementById('check-progress-count').textContent =
                     `发现 ${status.found_downloaded} 条已下载`;
             } else {
-                clearInterval(checkAllIntervalId);
+                stopWatch(checkAllIntervalId);
                 checkAllIntervalId = null;
 
                 document.getElementById('check-progress-card').style.display = 'none';
@@ -651,7 +673,7 @@ function pollCheckAllStatus() {
             }
         })
         .catch(err => {
-            clearInterval(checkAllIntervalId);
+            stopWatch(checkAllIntervalId);
             checkAllIntervalId = null;
 
             document.getElementById('check-progress-card').style.display = 'none';
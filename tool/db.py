@@ -0,0 +1,442 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from .runtime import ensure_parent_dir, runtime_paths
+
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=10000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _migrate_base_schema(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS getchu_games (
+            date TEXT,
+            name TEXT,
+            company TEXT,
+            size TEXT,
+            link TEXT,
+            nyaa_name TEXT,
+            comment TEXT,
+            downloaded INTEGER DEFAULT 0,
+            infohash_hex TEXT,
+            PRIMARY KEY (date, name)
+        )
+        """
+    )
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(getchu_games)").fetchall()}
+    if "nyaa_name" not in cols:
+        conn.execute("ALTER TABLE getchu_games ADD COLUMN nyaa_name TEXT")
+    if "downloaded" not in cols:
+        conn.execute("ALTER TABLE getchu_games ADD COLUMN downloaded INTEGER DEFAULT 0")
+    if "infohash_hex" not in cols:
+        conn.execute("ALTER TABLE getchu_games ADD COLUMN infohash_hex TEXT")
+
+
+def _migrate_nyaa_index(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS nyaa_torrents (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            size TEXT,
+            date TEXT,
+            magnet TEXT,
+            infohash_hex TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_nyaa_torrents_infohash ON nyaa_torrents(infohash_hex)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_nyaa_torrents_date ON nyaa_torrents(date)")
+    conn.execute("CREATE TABLE IF NOT EXISTS nyaa_index_state (key TEXT PRIMARY KEY, value TEXT)")
+    if not _create_fts(
+        conn,
+        "nyaa_torrents_fts",
+        "name, content='nyaa_torrents', content_rowid='id', tokenize='trigram'",
+    ):
+        logger.warning("当前SQLite不支持FTS5 trigram，本地Nyaa索引将退化为LIKE查询")
+        return
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS nyaa_torrents_ai AFTER INSERT ON nyaa_torrents BEGIN
+            INSERT INTO nyaa_torrents_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS nyaa_torrents_ad AFTER DELETE ON nyaa_torrents BEGIN
+            INSERT INTO nyaa_torrents_fts(nyaa_torrents_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS nyaa_torrents_au AFTER UPDATE OF name ON nyaa_torrents BEGIN
+            INSERT INTO nyaa_torrents_fts(nyaa_torrents_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO nyaa_torrents_fts(rowid, name) VALUES (new.id, new.name);
+        END
+        """
+    )
+    conn.execute("INSERT INTO nyaa_torrents_fts(nyaa_torrents_fts) VALUES ('rebuild')")
+
+
+def _migrate_year_month_columns(conn):
+    conn.execute(
+        "ALTER TABLE getchu_games ADD COLUMN year INTEGER "
+        "GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER)) VIRTUAL"
+    )
+    conn.execute(
+        "ALTER TABLE getchu_games ADD COLUMN month INTEGER "
+        "GENERATED ALWAYS AS (CAST(substr(date, 6, 2) AS INTEGER)) VIRTUAL"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_getchu_games_ym_name ON getchu_games(year DESC, month DESC, name)")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_getchu_games_missing_link ON getchu_games(year, month)
+        WHERE link IS NULL OR link = ''
+        """
+    )
+
+
+def _create_getchu_fts(conn, key):
+    if not _create_fts(
+        conn,
+        "getchu_games_fts",
+        f"name, company, nyaa_name, content='getchu_games', content_rowid='{key}', tokenize='trigram'",
+    ):
+        logger.warning("当前SQLite不支持FTS5 trigram，游戏搜索将退化为LIKE查询")
+        return
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS getchu_games_ai AFTER INSERT ON getchu_games BEGIN
+            INSERT INTO getchu_games_fts(rowid, name, company, nyaa_name)
+            VALUES (new.{key}, new.name, new.company, new.nyaa_name);
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS getchu_games_ad AFTER DELETE ON getchu_games BEGIN
+            INSERT INTO getchu_games_fts(getchu_games_fts, rowid, name, company, nyaa_name)
+            VALUES ('delete', old.{key}, old.name, old.company, old.nyaa_name);
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS getchu_games_au AFTER UPDATE OF name, company, nyaa_name ON getchu_games BEGIN
+            INSERT INTO getchu_games_fts(getchu_games_fts, rowid, name, company, nyaa_name)
+            VALUES ('delete', old.{key}, old.name, old.company, old.nyaa_name);
+            INSERT INTO getchu_games_fts(rowid, name, company, nyaa_name)
+            VALUES (new.{key}, new.name, new.company, new.nyaa_name);
+        END
+        """
+    )
+    conn.execute("INSERT INTO getchu_games_fts(getchu_games_fts) VALUES ('rebuild')")
+
+
+def _migrate_getchu_fts(conn):
+    _create_getchu_fts(conn, "rowid")
+
+
+def _migrate_jobs(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '{}',
+            state TEXT NOT NULL DEFAULT 'queued',
+            priority INTEGER NOT NULL DEFAULT 0,
+            progress REAL NOT NULL DEFAULT 0,
+            status TEXT,
+            pid INTEGER,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at INTEGER,
+            started_at INTEGER,
+            finished_at INTEGER,
+            heartbeat_at INTEGER
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state, priority DESC, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type ON jobs(type, id DESC)")
+
+
+def _migrate_job_checkpoints(conn):
+    conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_checkpoints (
+            job_id INTEGER NOT NULL,
+            item TEXT NOT NULL,
+            result TEXT,
+            created_at INTEGER,
+            PRIMARY KEY (job_id, item)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _migrate_lookup_schedule(conn):
+    conn.execute("ALTER TABLE getchu_games ADD COLUMN last_checked_at INTEGER")
+    conn.execute("ALTER TABLE getchu_games ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE getchu_games ADD COLUMN last_result TEXT")
+
+
+def _migrate_nyaa_candidates(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS nyaa_candidates (
+            game_date TEXT NOT NULL,
+            game_name TEXT NOT NULL,
+            infohash_hex TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size TEXT,
+            date TEXT,
+            magnet TEXT,
+            fetched_at INTEGER,
+            PRIMARY KEY (game_date, game_name, infohash_hex)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _migrate_p115_mirror(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS p115_files (
+            id INTEGER PRIMARY KEY,
+            parent_id INTEGER NOT NULL,
+            is_dir INTEGER NOT NULL DEFAULT 0,
+            name TEXT NOT NULL,
+            norm_name TEXT NOT NULL,
+            size INTEGER,
+            pick_code TEXT,
+            sha1 TEXT,
+            mtime INTEGER,
+            listed_at INTEGER
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_p115_files_parent ON p115_files(parent_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_p115_files_norm ON p115_files(norm_name)")
+    conn.execute("CREATE TABLE IF NOT EXISTS p115_mirror_state (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _migrate_rate_limits(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def _migrate_job_revision(conn):
+    conn.execute("ALTER TABLE jobs ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    conn.execute("UPDATE jobs SET revision = id")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_revision ON jobs(revision)")
+
+
+def _migrate_p115_files_fts(conn):
+    if not _create_fts(
+        conn,
+        "p115_files_fts",
+        "norm_name, content='p115_files', content_rowid='id', tokenize='trigram'",
+    ):
+        logger.warning("当前SQLite不支持FTS5 trigram，115目录镜像匹配将退化为LIKE查询")
+        return
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS p115_files_ai AFTER INSERT ON p115_files BEGIN
+            INSERT INTO p115_files_fts(rowid, norm_name) VALUES (new.id, new.norm_name);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS p115_files_ad AFTER DELETE ON p115_files BEGIN
+            INSERT INTO p115_files_fts(p115_files_fts, rowid, norm_name) VALUES ('delete', old.id, old.norm_name);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS p115_files_au AFTER UPDATE OF norm_name ON p115_files
+        WHEN old.norm_name IS NOT new.norm_name BEGIN
+            INSERT INTO p115_files_fts(p115_files_fts, rowid, norm_name) VALUES ('delete', old.id, old.norm_name);
+            INSERT INTO p115_files_fts(rowid, norm_name) VALUES (new.id, new.norm_name);
+        END
+        """
+    )
+    conn.execute("INSERT INTO p115_files_fts(p115_files_fts) VALUES ('rebuild')")
+
+
+def _migrate_getchu_games_id(conn):
+    # 隐式 rowid 在 VACUUM 时可能被重新编号，全文索引改为指向显式的 INTEGER PRIMARY KEY
+    for trigger in ("getchu_games_ai", "getchu_games_ad", "getchu_games_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS getchu_games_fts")
+    conn.execute(
+        """
+        CREATE TABLE getchu_games_new (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            name TEXT,
+            company TEXT,
+            size TEXT,
+            link TEXT,
+            nyaa_name TEXT,
+            comment TEXT,
+            downloaded INTEGER DEFAULT 0,
+            infohash_hex TEXT,
+            year INTEGER GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER)) VIRTUAL,
+            month INTEGER GENERATED ALWAYS AS (CAST(substr(date, 6, 2) AS INTEGER)) VIRTUAL,
+            last_checked_at INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_result TEXT,
+            UNIQUE (date, name)
+        )
+        """
+    )
+    columns = "date, name, company, size, link, nyaa_name, comment, downloaded, infohash_hex, last_checked_at, attempts, last_result"
+    conn.execute(f"INSERT INTO getchu_games_new (id, {columns}) SELECT rowid, {columns} FROM getchu_games ORDER BY rowid")
+    conn.execute("DROP TABLE getchu_games")
+    conn.execute("ALTER TABLE getchu_games_new RENAME TO getchu_games")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_getchu_games_ym_name ON getchu_games(year DESC, month DESC, name)")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_getchu_games_missing_link ON getchu_games(year, month)
+        WHERE link IS NULL OR link = ''
+        """
+    )
+    _create_getchu_fts(conn, "id")
+
+
+MIGRATIONS = (
+    _migrate_base_schema,
+    _migrate_nyaa_index,
+    _migrate_year_month_columns,
+    _migrate_getchu_fts,
+    _migrate_jobs,
+    _migrate_job_checkpoints,
+    _migrate_lookup_schedule,
+    _migrate_nyaa_candidates,
+    _migrate_p115_mirror,
+    _migrate_rate_limits,
+    _migrate_job_revision,
+    _migrate_p115_files_fts,
+    _migrate_getchu_games_id,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def _create_fts(conn, name, spec):
+    conn.execute(f"SAVEPOINT create_{name}")
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({spec})")
+    except sqlite3.OperationalError:
+        conn.execute(f"ROLLBACK TO create_{name}")
+        conn.execute(f"RELEASE create_{name}")
+        return False
+    conn.execute(f"RELEASE create_{name}")
+    return True
+
+
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        for index in range(version, SCHEMA_VERSION):
+            logger.info("执行数据库迁移 %s", index + 1)
+            MIGRATIONS[index](conn)
+        if version < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def ensure_getchu_schema(conn):
+    migrate(conn)
+
+
+def _open(path, check_same_thread=True):
+    ensure_parent_dir(path)
+    conn = sqlite3.connect(path, timeout=10, cached_statements=256, check_same_thread=check_same_thread)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    with _migrated_lock:
+        if path not in _migrated:
+            migrate(conn)
+            _migrated.add(path)
+    return conn
+
+
+def connect(db_path=None):
+    path = os.path.abspath(db_path or runtime_paths()["db_path"])
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        _local.pid = pid
+        _local.conns = {}
+    conn = _local.conns.get(path)
+    if conn is None:
+        conn = _open(path)
+        _local.conns[path] = conn
+    return conn
+
+
+def open_connection(db_path=None):
+    return _open(os.path.abspath(db_path or runtime_paths()["db_path"]), check_same_thread=False)
+
+
+def close_all():
+    conns = getattr(_local, "conns", None) or {}
+    for conn in conns.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    _local.conns = {}
@@ -1,93 +1,129 @@
-import argparse
-import logging
-import os
-import signal
-import sys
-import traceback
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
-
 import tool
-from tool.runtime import now_ts, runtime_paths, write_json_atomic
-
-
-_stop_requested = False
-
-
-def _handle_stop(signum, frame):
-    global _stop_requested
-    _stop_requested = True
-
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--year", type=int, required=True)
-    parser.add_argument("--month", type=int, default=0)
-    args = parser.parse_args()
-
-    paths = runtime_paths()
-    os.makedirs(paths["status_dir"], exist_ok=True)
-    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
-
-    logging.basicConfig(
-        filename=paths["log_path"],
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
+from tool import http_cache
+from tool.core import game_key, split_due_games
+from tool.db import connect
+from tool.runtime import now_ts, runtime_paths
+
+
+def _pending_count(conn, year, months, done, force):
+    pending = 0
+    scheduled = 0
+    for month in months:
+        rows = conn.execute(
+            """
+            SELECT date, name, company, attempts, last_checked_at FROM getchu_games
+            WHERE year = ? AND month = ? AND (link IS NULL OR link = '')
+            """,
+            (year, month),
+        ).fetchall()
+        due, skipped = split_due_games([row for row in rows if game_key(row[0], row[1]) not in done], force)
+        pending += len(due)
+        scheduled += skipped
+    return pending, scheduled
+
+
+def run(job):
+    params = job.params
+    if params.get("no_cache"):
+        http_cache.set_enabled(False)
+
+    year = int(params["year"])
+    month = int(params.get("month") or 0)
+    months = list(range(1, 13)) if month == 0 else [month]
+    force = bool(params.get("force"))
+
+    config = runtime_paths()["config"]
+    concurrency = int(config.get("nyaa_concurrency", 4))
+    rate = float(config.get("nyaa_rate", 1.0))
+    burst = int(config.get("nyaa_burst", 2))
+    source = config.get("nyaa_source", "live")
+
+    done = job.completed_items()
+    done_months = {int(item[len("month:"):]) for item in done if item.startswith("month:")}
+    done_games = {item for item in done if not item.startswith("month:")}
+    processed = len(done_games)
+    pending, scheduled = _pending_count(connect(), year, [m for m in months if m not in done_months], done_games, force)
+    total = processed + pending
+
+    status = job.status
+    status.update(
+        {
+            "running": True,
+            "year": year,
+            "month": month,
+            "current_month": None,
+            "finished_months": len(done_months),
+            "total_months": len(months),
+            "games_total": total,
+            "games_processed": processed,
+            "games_remaining": total - processed,
+            "schedule_skipped": scheduled,
+            "games_failed": 0,
+            "resumed": bool(done),
+            "started_at": status.get("started_at") or now_ts(),
+            "message": None,
+            "stopped_reason": None,
+        }
     )
-
-    signal.signal(signal.SIGTERM, _handle_stop)
-    signal.signal(signal.SIGINT, _handle_stop)
-
-    months = list(range(1, 13)) if args.month in (0, None) else [int(args.month)]
-
-    status = {
-        "running": True,
-        "pid": os.getpid(),
-        "year": int(args.year),
-        "month": int(args.month),
-        "current_month": None,
-        "finished_months": 0,
-        "total_months": len(months),
-        "started_at": now_ts(),
-        "updated_at": now_ts(),
-        "message": None,
-        "stopped_reason": None,
-    }
-    write_json_atomic(paths["download_status_path"], status)
-
-    try:
-        success_all = True
-        for m in months:
-            if _stop_requested:
-                status["stopped_reason"] = "signal"
-                success_all = False
-                break
-
-            status["current_month"] = m
-            status["updated_at"] = now_ts()
-            write_json_atomic(paths["download_status_path"], status)
-
-            ok = tool.download_games_by_month(int(args.year), m)
-            success_all = success_all and bool(ok)
-
+    job.report(processed / total * 100 if total else 0.0, force=True)
+
+    def _on_result(conn, game, result):
+        # 请求失败的游戏不记检查点，重试任务时重新查询
+        if result == "error":
+            status["games_failed"] += 1
+            return
+        job.checkpoint(conn, game_key(game[0], game[1]), result)
+
+    def _on_commit(count):
+        status["games_processed"] += count
+        status["games_remaining"] = max(0, status["games_total"] - status["games_processed"])
+        job.report(status["games_processed"] / status["games_total"] * 100 if status["games_total"] else None)
+
+    success_all = True
+    for m in months:
+        if m in done_months:
+            continue
+        if job.stop_requested:
+            status["stopped_reason"] = "signal"
+            success_all = False
+            break
+
+        status["current_month"] = m
+        failed_before = status["games_failed"]
+        job.report(force=True)
+
+        ok = tool.download_games_by_month(
+            year,
+            m,
+            concurrency=concurrency,
+            rate=rate,
+            burst=burst,
+            source=source,
+            skip=done_games,
+            force=force,
+            on_result=_on_result,
+            on_commit=_on_commit,
+            should_stop=lambda: job.stop_requested,
+        )
+        success_all = success_all and bool(ok)
+        if job.stop_requested:
+            status["stopped_reason"] = "signal"
+            success_all = False
+            break
+
+        # 有游戏请求失败的月份不记检查点，重试任务时只重查这些游戏
+        complete = ok and status["games_failed"] == failed_before
+        if complete:
+            conn = connect()
+            job.checkpoint(conn, f"month:{m}")
+            conn.commit()
             status["finished_months"] += 1
-            status["message"] = "success" if ok else "failed"
-            status["updated_at"] = now_ts()
-            write_json_atomic(paths["download_status_path"], status)
-
-        status["running"] = False
-        status["message"] = "success" if success_all else (status["stopped_reason"] or "failed")
-        status["updated_at"] = now_ts()
-        write_json_atomic(paths["download_status_path"], status)
-    except Exception:
-        status["running"] = False
-        status["stopped_reason"] = "error"
-        status["message"] = "failed"
-        status["error"] = traceback.format_exc()
-        status["updated_at"] = now_ts()
-        write_json_atomic(paths["download_status_path"], status)
-        raise
-
-
-if __name__ == "__main__":
-    main()
+        status["message"] = "success" if complete else ("partial" if ok else "failed")
+        job.report(force=True)
+
+    if success_all and status["games_failed"]:
+        status["stopped_reason"] = "lookup_failed"
+        status["message"] = "partial"
+        return False
+    status["message"] = "success" if success_all else (status["stopped_reason"] or "failed")
+    return success_all or job.stop_requested
@@ -0,0 +1,279 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from . import http_client
+from .runtime import read_config, runtime_paths
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+TTL_GETCHU_OLD = 30 * DAY
+TTL_GETCHU_RECENT = 6 * HOUR
+TTL_NYAA = 1 * HOUR
+TTL_DEFAULT = 1 * HOUR
+TTL_NEGATIVE = 6 * HOUR
+
+_lock = threading.Lock()
+_cache = None
+_enabled = None
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    if _enabled is None:
+        return bool(read_config().get("http_cache_enabled", True))
+    return _enabled
+
+
+def normalize_url(url):
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        netloc = f"{netloc}:{parts.port}"
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or "/", query, ""))
+
+
+def ttl_for(url, now=None):
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if host.endswith("getchu.com"):
+        query = dict(parse_qsl(parts.query))
+        try:
+            year = int(query.get("year"))
+            month = int(query.get("month"))
+        except (TypeError, ValueError):
+            return TTL_GETCHU_RECENT
+        today = datetime.fromtimestamp(now or time.time())
+        age_months = (today.year - year) * 12 + (today.month - month)
+        return TTL_GETCHU_OLD if age_months >= 2 else TTL_GETCHU_RECENT
+    if host.endswith("nyaa.si"):
+        return TTL_NYAA
+    return TTL_DEFAULT
+
+
+def negative_ttl_for(url, now=None):
+    # 未命中的缓存不应比命中的缓存保留得更久
+    return min(TTL_NEGATIVE, ttl_for(url, now))
+
+
+class CachedResponse:
+    def __init__(self, url, content, encoding, status_code=200):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.status_code = status_code
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        return None
+
+
+class ResponseCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.max_bytes = max_bytes
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                blob TEXT,
+                size INTEGER,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                expires_at REAL,
+                last_access REAL,
+                negative INTEGER DEFAULT 0
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_blob ON responses(blob)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def lookup(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT blob, encoding, etag, last_modified, expires_at, negative FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        blob, encoding, etag, last_modified, expires_at, negative = row
+        try:
+            with open(self._blob_path(blob), "rb") as f:
+                content = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            self.delete(key)
+            return None
+        return {
+            "content": content,
+            "encoding": encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+            "negative": bool(negative),
+        }
+
+    def touch(self, key, expires_at=None):
+        now = time.time()
+        with self._lock:
+            if expires_at is None:
+                self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            else:
+                self.conn.execute(
+                    "UPDATE responses SET last_access = ?, fetched_at = ?, expires_at = ? WHERE key = ?",
+                    (now, now, expires_at, key),
+                )
+            self.conn.commit()
+
+    def store(self, key, url, content, encoding, etag, last_modified, ttl):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(content, 6))
+            os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT blob FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, url, blob, size, encoding, etag, last_modified, fetched_at, expires_at, last_access, negative)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, url, digest, size, encoding, etag, last_modified, now, now + ttl, now),
+            )
+            self.conn.commit()
+            if old and old[0] != digest:
+                self._drop_blob_if_unused(old[0])
+        self.evict()
+
+    def mark_negative(self, key, ttl):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE responses SET negative = 1, expires_at = fetched_at + ? WHERE key = ?",
+                (ttl, key),
+            )
+            self.conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT blob FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            if row:
+                self._drop_blob_if_unused(row[0])
+
+    def _drop_blob_if_unused(self, digest):
+        used = self.conn.execute("SELECT 1 FROM responses WHERE blob = ? LIMIT 1", (digest,)).fetchone()
+        if not used:
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def evict(self):
+        if not self.max_bytes or self.max_bytes <= 0:
+            return
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM responses)").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            rows = self.conn.execute("SELECT key, blob FROM responses ORDER BY last_access ASC").fetchall()
+            for key, digest in rows:
+                if total <= target:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                used = self.conn.execute("SELECT 1 FROM responses WHERE blob = ? LIMIT 1", (digest,)).fetchone()
+                if not used:
+                    path = self._blob_path(digest)
+                    try:
+                        total -= os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self.conn.commit()
+
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            paths = runtime_paths()
+            max_mb = float(paths["config"].get("http_cache_max_mb", 200))
+            _cache = ResponseCache(paths["http_cache_dir"], int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def cached_get(url, **kwargs):
+    if not is_enabled():
+        return http_client.get(url, **kwargs)
+
+    cache = get_cache()
+    key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+    entry = cache.lookup(key)
+    now = time.time()
+    if entry and entry["expires_at"] > now:
+        cache.touch(key)
+        return CachedResponse(url, entry["content"], entry["encoding"])
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    response = http_client.get(url, headers=headers, **kwargs)
+
+    ttl = ttl_for(url, now)
+    if response.status_code == 304 and entry:
+        cache.touch(key, now + (negative_ttl_for(url, now) if entry["negative"] else ttl))
+        return CachedResponse(url, entry["content"], entry["encoding"])
+    if response.status_code != 200:
+        return response
+
+    encoding = response.encoding or response.apparent_encoding
+    # 只保存服务器实际返回的校验值，没有时过期后直接重新请求
+    cache.store(
+        key, url, response.content, encoding, response.headers.get("ETag"), response.headers.get("Last-Modified"), ttl
+    )
+    return response
+
+
+def mark_negative(url):
+    if not is_enabled():
+        return
+    key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+    get_cache().mark_negative(key, negative_ttl_for(url))
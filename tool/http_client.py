@@ -0,0 +1,90 @@
+import random
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+from . import ratelimit
+from .runtime import read_config
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class JitteredRetry(Retry):
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, backoff)
+
+
+def _settings():
+    config = read_config()
+    return {
+        "pool_size": int(config.get("http_pool_size", 10)),
+        "retries": int(config.get("http_retries", 3)),
+        "backoff": float(config.get("http_backoff", 0.5)),
+        "timeout": (
+            float(config.get("http_connect_timeout", 5)),
+            float(config.get("http_read_timeout", 30)),
+        ),
+    }
+
+
+def _new_session(settings):
+    sess = requests.Session()
+    # 会话按主机复用连接，cookie 只随单次请求传入，避免在不同调用之间串用
+    sess.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    sess.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+    retry = JitteredRetry(
+        total=settings["retries"],
+        backoff_factor=settings["backoff"],
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings["pool_size"], max_retries=retry)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    sess.default_timeout = settings["timeout"]
+    return sess
+
+
+def get_session(url):
+    parts = urlsplit(url)
+    key = (parts.scheme, (parts.hostname or "").lower(), parts.port)
+    with _sessions_lock:
+        sess = _sessions.get(key)
+        if sess is None:
+            sess = _new_session(_settings())
+            _sessions[key] = sess
+        return sess
+
+
+def request(method, url, **kwargs):
+    sess = get_session(url)
+    kwargs.setdefault("timeout", sess.default_timeout)
+    ratelimit.acquire(url)
+    return sess.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def close_all():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for sess in sessions:
+        sess.close()
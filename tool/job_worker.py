@@ -0,0 +1,203 @@
+import argparse
+import importlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from tool import db, jobs
+from tool.progress import JsonFileBackend, ProgressReporter
+from tool.runtime import now_ts, runtime_paths
+
+
+HANDLERS = {
+    "spider": "tool.spider_worker",
+    "download": "tool.download_worker",
+    "check_all": "tool.check_all_worker",
+}
+
+logger = logging.getLogger(__name__)
+
+_stop_requested = False
+
+
+def _handle_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+
+
+def _setup_logging(paths):
+    os.makedirs(paths["status_dir"], exist_ok=True)
+    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
+    logging.basicConfig(
+        filename=paths["log_path"],
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+
+def run_job(job_id):
+    paths = runtime_paths()
+    _setup_logging(paths)
+
+    job = jobs.open_job(job_id)
+
+    def _stop(signum, frame):
+        job.request_stop()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    stop_event = threading.Event()
+
+    def _heartbeat():
+        last_beat = time.monotonic()
+        while not stop_event.wait(max(0.05, min(job.reporter.interval, jobs.HEARTBEAT_INTERVAL))):
+            try:
+                job.reporter.flush_if_due()
+                if time.monotonic() - last_beat >= jobs.HEARTBEAT_INTERVAL:
+                    job.heartbeat()
+                    last_beat = time.monotonic()
+            except Exception:
+                pass
+
+    t = threading.Thread(target=_heartbeat, daemon=True)
+    t.start()
+
+    logger.info("任务 %s (%s) 开始: %s", job.id, job.type, job.params)
+    state = "done"
+    error = None
+    try:
+        handler = importlib.import_module(HANDLERS[job.type])
+        ok = handler.run(job)
+        if job.stop_requested:
+            state = "cancelled" if job.cancel_requested() else "queued"
+        elif ok is False:
+            state = "failed"
+    except Exception:
+        state = "failed"
+        error = traceback.format_exc()
+        job.status["stopped_reason"] = "error"
+        job.status["error"] = error
+        logger.error("任务 %s 执行失败: %s", job.id, error)
+    finally:
+        stop_event.set()
+        job.status["running"] = False
+        job.report(force=True)
+        if state == "queued":
+            jobs.requeue(job.id)
+        else:
+            jobs.finish(job.id, state, error)
+        db.close_all()
+    logger.info("任务 %s 结束: %s", job.id, "已中断，等待恢复" if state == "queued" else state)
+
+
+def _spawn(children, job_id):
+    children[job_id] = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "run", "--job-id", str(job_id)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    logger.info("已启动任务 %s (pid=%s)", job_id, children[job_id].pid)
+
+
+def run_scheduler(max_workers=None, idle_exit=None):
+    paths = runtime_paths()
+    _setup_logging(paths)
+    config = paths["config"]
+    max_workers = max(1, int(max_workers or config.get("job_workers", 2)))
+    idle_exit = float(idle_exit if idle_exit is not None else config.get("job_idle_exit", 30))
+
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+
+    conn = db.connect()
+    status = {"pid": os.getpid(), "started_at": now_ts(), "max_workers": max_workers, "running_jobs": []}
+    reporter = ProgressReporter(JsonFileBackend(paths["scheduler_status_path"]), status, interval=jobs.HEARTBEAT_INTERVAL)
+    reporter.report(force=True)
+    logger.info("任务调度器已启动 (pid=%s, workers=%s)", os.getpid(), max_workers)
+
+    children = {}
+    idle_since = time.monotonic()
+    try:
+        while not _stop_requested:
+            for job_id, p in list(children.items()):
+                if p.poll() is None:
+                    continue
+                children.pop(job_id)
+                if p.returncode != 0:
+                    jobs.requeue_or_fail(job_id, f"任务进程异常退出 (code={p.returncode})", conn)
+
+            jobs.reap_stale(conn)
+
+            for job_id in list(children):
+                row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row and row[0] and children[job_id].poll() is None:
+                    children[job_id].terminate()
+
+            while len(children) < max_workers:
+                job_id = jobs.claim_next(conn)
+                if job_id is None:
+                    break
+                _spawn(children, job_id)
+
+            now = time.monotonic()
+            if children:
+                idle_since = now
+            elif now - idle_since > idle_exit:
+                # 先清除 pid 再检查一次队列：之后入队的任务会由 ensure_scheduler 拉起新的调度器
+                status["pid"] = None
+                reporter.report(force=True)
+                job_id = jobs.claim_next(conn)
+                if job_id is None:
+                    break
+                status["pid"] = os.getpid()
+                _spawn(children, job_id)
+                idle_since = now
+
+            running_jobs = sorted(children)
+            transition = running_jobs != status["running_jobs"]
+            status["running_jobs"] = running_jobs
+            reporter.report(force=transition)
+            time.sleep(0.5)
+    finally:
+        for p in children.values():
+            if p.poll() is None:
+                p.terminate()
+        for p in children.values():
+            try:
+                p.wait(10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        status["pid"] = None
+        status["running_jobs"] = []
+        reporter.report(force=True)
+        db.close_all()
+        logger.info("任务调度器已退出")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_scheduler = sub.add_parser("scheduler")
+    p_scheduler.add_argument("--workers", type=int)
+    p_scheduler.add_argument("--idle-exit", type=float)
+
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--job-id", type=int, required=True)
+
+    args = parser.parse_args()
+    if args.mode == "scheduler":
+        run_scheduler(args.workers, args.idle_exit)
+    else:
+        run_job(args.job_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .db import connect, open_connection
+from .progress import NEXT_REVISION, ProgressReporter, SqliteJobBackend
+from .runtime import now_ts, pid_is_running, read_json, runtime_paths
+
+
+JOB_TYPES = ("spider", "download", "check_all")
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("done", "failed", "cancelled")
+
+REPORT_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 5
+STALE_AFTER = 60
+MAX_ATTEMPTS = 3
+
+_COLUMNS = "id, type, params, state, priority, progress, status, pid, cancel_requested, error, created_at, started_at, finished_at, heartbeat_at, attempts, revision"
+
+
+def _row_to_dict(row):
+    job = dict(zip([c.strip() for c in _COLUMNS.split(",")], row))
+    job["params"] = json.loads(job["params"] or "{}")
+    job["status"] = json.loads(job["status"]) if job["status"] else {}
+    return job
+
+
+def job_scope(job_type, params):
+    if job_type == "spider":
+        if "start_year" not in params or "end_year" not in params:
+            raise ValueError("spider 任务需要 start_year 与 end_year")
+        start_year = int(params["start_year"])
+        end_year = int(params["end_year"])
+        return set(range(min(start_year, end_year), max(start_year, end_year) + 1))
+    if job_type == "check_all":
+        # check_all_worker 只在同时指定年月时按月过滤，否则校验全部链接
+        if params.get("year") and params.get("month"):
+            return {(int(params["year"]), int(params["month"]))}
+        return None
+    if job_type == "download" and not params.get("year"):
+        raise ValueError("download 任务需要 year")
+    if params.get("year"):
+        return {int(params["year"])}
+    return None
+
+
+def conflicts(job_type, params, other_type, other_params):
+    if job_type != other_type:
+        return False
+    scope = job_scope(job_type, params)
+    other = job_scope(other_type, other_params)
+    return scope is None or other is None or bool(scope & other)
+
+
+def enqueue(job_type, params, priority=0, conn=None):
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"未知任务类型: {job_type}")
+    if not isinstance(params, dict):
+        raise ValueError("params 必须是JSON对象")
+    job_scope(job_type, params)
+    conn = conn or connect()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO jobs (type, params, state, priority, created_at, revision) "
+            "VALUES (?, ?, 'queued', ?, ?, (SELECT COALESCE(MAX(revision), 0) + 1 FROM jobs))",
+            (job_type, json.dumps(params, ensure_ascii=False), int(priority), now_ts()),
+        )
+    return cursor.lastrowid
+
+
+def get_job(job_id, conn=None):
+    conn = conn or connect()
+    row = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (int(job_id),)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def list_jobs(state=None, job_type=None, limit=50, conn=None):
+    conn = conn or connect()
+    where = []
+    params = []
+    if state:
+        where.append("state = ?")
+        params.append(state)
+    if job_type:
+        where.append("type = ?")
+        params.append(job_type)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    rows = conn.execute(f"SELECT {_COLUMNS} FROM jobs {where_sql} ORDER BY id DESC LIMIT ?", params + [int(limit)]).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+
+def cancel(job_id, conn=None):
+    conn = conn or connect()
+    with conn:
+        cursor = conn.execute(
+            f"UPDATE jobs SET state = 'cancelled', finished_at = ?, {NEXT_REVISION} WHERE id = ? AND state = 'queued'",
+            (now_ts(), int(job_id)),
+        )
+        if cursor.rowcount:
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = 'running'",
+            (int(job_id),),
+        )
+    return cursor.rowcount > 0
+
+
+def cancel_type(job_type, conn=None):
+    conn = conn or connect()
+    ids = [row[0] for row in conn.execute(
+        "SELECT id FROM jobs WHERE type = ? AND state IN ('queued', 'running')", (job_type,)
+    ).fetchall()]
+    return [job_id for job_id in ids if cancel(job_id, conn)]
+
+
+def reap_stale(conn=None):
+    conn = conn or connect()
+    cutoff = now_ts() - STALE_AFTER
+    rows = conn.execute(
+        "SELECT id, pid FROM jobs WHERE state = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ?",
+        (cutoff,),
+    ).fetchall()
+    reaped = []
+    for job_id, pid in rows:
+        if pid and pid_is_running(int(pid)):
+            continue
+        requeue_or_fail(job_id, "not_running", conn)
+        reaped.append(job_id)
+    return reaped
+
+
+def requeue(job_id, conn=None):
+    conn = conn or connect()
+    with conn:
+        conn.execute(
+            f"UPDATE jobs SET state = 'queued', pid = NULL, {NEXT_REVISION} WHERE id = ? AND state = 'running'",
+            (int(job_id),),
+        )
+
+
+def requeue_or_fail(job_id, error, conn=None):
+    conn = conn or connect()
+    with conn:
+        conn.execute(
+            f"""
+            UPDATE jobs
+            SET state = CASE
+                    WHEN cancel_requested = 1 THEN 'cancelled'
+                    WHEN attempts < ? THEN 'queued'
+                    ELSE 'failed'
+                END,
+                finished_at = CASE WHEN cancel_requested = 0 AND attempts < ? THEN NULL ELSE ? END,
+                pid = NULL,
+                error = ?,
+                {NEXT_REVISION}
+            WHERE id = ? AND state = 'running'
+            """,
+            (MAX_ATTEMPTS, MAX_ATTEMPTS, now_ts(), error, int(job_id)),
+        )
+
+
+def retry(job_id, conn=None):
+    conn = conn or connect()
+    with conn:
+        cursor = conn.execute(
+            f"""
+            UPDATE jobs
+            SET state = 'queued', attempts = 0, cancel_requested = 0, error = NULL, pid = NULL, finished_at = NULL,
+                {NEXT_REVISION}
+            WHERE id = ? AND state IN ('failed', 'cancelled')
+            """,
+            (int(job_id),),
+        )
+    return cursor.rowcount > 0
+
+
+def claim_next(conn):
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        running = [
+            (row[0], json.loads(row[1] or "{}"))
+            for row in conn.execute("SELECT type, params FROM jobs WHERE state = 'running'").fetchall()
+        ]
+        candidates = conn.execute(
+            "SELECT id, type, params FROM jobs WHERE state = 'queued' ORDER BY priority DESC, id"
+        ).fetchall()
+        for job_id, job_type, params in candidates:
+            params = json.loads(params or "{}")
+            if any(conflicts(job_type, params, t, p) for t, p in running):
+                continue
+            now = now_ts()
+            conn.execute(
+                "UPDATE jobs SET state = 'running', started_at = ?, heartbeat_at = ?, pid = NULL, attempts = attempts + 1, "
+                f"{NEXT_REVISION} WHERE id = ?",
+                (now, now, job_id),
+            )
+            conn.commit()
+            return job_id
+        conn.commit()
+        return None
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def finish(job_id, state, error=None, conn=None):
+    conn = conn or connect()
+    with conn:
+        conn.execute(
+            f"UPDATE jobs SET state = ?, error = COALESCE(?, error), finished_at = ?, {NEXT_REVISION} "
+            "WHERE id = ? AND state = 'running'",
+            (state, error, now_ts(), int(job_id)),
+        )
+        if state == "done":
+            conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (int(job_id),))
+
+
+def checkpoint_count(job_id, conn=None):
+    conn = conn or connect()
+    return conn.execute("SELECT COUNT(*) FROM job_checkpoints WHERE job_id = ?", (int(job_id),)).fetchone()[0]
+
+
+def _is_stale(job):
+    if job["state"] != "running":
+        return False
+    if (job["heartbeat_at"] or job["started_at"] or 0) >= now_ts() - STALE_AFTER:
+        return False
+    return not (job["pid"] and pid_is_running(int(job["pid"])))
+
+
+def type_status(job_type, default, conn=None):
+    # 只读：失效任务由调度器或 start/enqueue/retry 命令回收，这里只标记
+    conn = conn or connect()
+    row = conn.execute(
+        f"SELECT {_COLUMNS} FROM jobs WHERE type = ? AND state = 'running' ORDER BY id LIMIT 1", (job_type,)
+    ).fetchone() or conn.execute(
+        f"SELECT {_COLUMNS} FROM jobs WHERE type = ? ORDER BY id DESC LIMIT 1", (job_type,)
+    ).fetchone()
+    if not row:
+        return default
+
+    job = _row_to_dict(row)
+    stale = _is_stale(job)
+    status = dict(default)
+    status.update(job["status"])
+    status.update(
+        {
+            "job_id": job["id"],
+            "state": job["state"],
+            "running": job["state"] in ACTIVE_STATES and not stale,
+            "stale": stale,
+            "pid": job["pid"],
+            "revision": job["revision"],
+            "started_at": status.get("started_at") or job["started_at"],
+        }
+    )
+    if job["state"] == "queued":
+        status["message"] = status.get("message") or "queued"
+    elif job["state"] == "cancelled":
+        status["stopped_reason"] = status.get("stopped_reason") or "stopped"
+    elif job["state"] == "failed":
+        status["stopped_reason"] = status.get("stopped_reason") or "error"
+        status["error"] = job["error"]
+    status["queued"] = conn.execute(
+        "SELECT COUNT(*) FROM jobs WHERE type = ? AND state = 'queued'", (job_type,)
+    ).fetchone()[0]
+    return status
+
+
+def wait_type_status(job_type, default, since=None, timeout=25):
+    from .watch import db_watcher
+
+    with db_watcher(runtime_paths()["db_path"]) as watcher:
+        status = type_status(job_type, default)
+        since = status.get("revision") or 0 if since is None else since
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        while (status.get("revision") or 0) <= since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not watcher.wait(remaining):
+                break
+            status = type_status(job_type, default)
+    return status
+
+
+class Job:
+    def __init__(self, job, conn):
+        self.id = job["id"]
+        self.type = job["type"]
+        self.params = job["params"]
+        self.status = dict(job["status"])
+        self._conn = conn
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        interval = float(runtime_paths()["config"].get("progress_interval_ms", REPORT_INTERVAL * 1000)) / 1000
+        self.reporter = ProgressReporter(SqliteJobBackend(conn, self.id, self._lock), self.status, job["progress"], interval)
+
+    @property
+    def progress(self):
+        return self.reporter.progress
+
+    @property
+    def stop_requested(self):
+        return self._stop.is_set()
+
+    def request_stop(self):
+        self._stop.set()
+
+    def report(self, progress=None, force=False):
+        return self.reporter.report(progress, force)
+
+    def heartbeat(self):
+        with self._lock:
+            if time.monotonic() - self.reporter.last_flush >= HEARTBEAT_INTERVAL:
+                self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (now_ts(), self.id))
+                self._conn.commit()
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.id,)).fetchone()
+        if row and row[0]:
+            self.request_stop()
+
+    def cancel_requested(self):
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.id,)).fetchone()
+        return bool(row and row[0])
+
+    def completed_items(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT item FROM job_checkpoints WHERE job_id = ?", (self.id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def checkpoint(self, conn, item, result=None):
+        conn.execute(
+            "INSERT OR REPLACE INTO job_checkpoints (job_id, item, result, created_at) VALUES (?, ?, ?, ?)",
+            (self.id, item, result, now_ts()),
+        )
+
+
+def open_job(job_id, db_path=None):
+    conn = open_connection(db_path)
+    job = get_job(job_id, conn)
+    if job is None:
+        conn.close()
+        raise ValueError(f"任务不存在: {job_id}")
+    with conn:
+        conn.execute("UPDATE jobs SET pid = ?, heartbeat_at = ? WHERE id = ?", (os.getpid(), now_ts(), job["id"]))
+    return Job(job, conn)
+
+
+def scheduler_status():
+    paths = runtime_paths()
+    status = read_json(paths["scheduler_status_path"], {})
+    pid = status.get("pid")
+    status["running"] = bool(pid and pid_is_running(int(pid)))
+    return status
+
+
+def ensure_scheduler(wait_s=2.0):
+    status = scheduler_status()
+    if status["running"]:
+        return status["pid"]
+
+    paths = runtime_paths()
+    os.makedirs(paths["status_dir"], exist_ok=True)
+    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
+    launch_log = os.path.join(os.path.dirname(paths["log_path"]) or ".", "scheduler_launch.log")
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(launch_log, "ab", buffering=0) as launch_fp:
+        p = subprocess.Popen(
+            [sys.executable, os.path.join(base_dir, "job_worker.py"), "scheduler"],
+            cwd=base_dir,
+            stdout=launch_fp,
+            stderr=launch_fp,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + wait_s
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if read_json(paths["scheduler_status_path"], {}).get("pid") == p.pid:
+            return p.pid
+        if p.poll() is not None:
+            break
+    return None
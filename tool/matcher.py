@@ -0,0 +1,182 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+
+
+def _trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _build(node):
+        terminal = "" in node
+        branches = [re.escape(ch) + _build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            return "(?:" + body + ")?"
+        return body
+
+    return _build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = tuple(sorted(dict.fromkeys(k for k in keywords if k), key=len, reverse=True))
+        self._re = re.compile(_trie_pattern(self.keywords)) if self.keywords else None
+
+    def __bool__(self):
+        return self._re is not None
+
+    def search(self, text):
+        return self._re is not None and bool(text) and self._re.search(text) is not None
+
+    def sub(self, repl, text, strip=False):
+        if self._re is None or not text or self._re.search(text) is None:
+            return text
+        # 关键词可能互相重叠，删除后也可能拼出新的关键词，命中时仍按从长到短逐个替换
+        for keyword in self.keywords:
+            if keyword in text:
+                text = text.replace(keyword, repl)
+                if strip:
+                    text = text.strip()
+        return text
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def matcher_for(keywords):
+    key = tuple(keywords or ())
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+        if matcher is None:
+            if len(_matchers) >= 8:
+                _matchers.clear()
+            matcher = _matchers[key] = KeywordMatcher(key)
+    return matcher
+
+
+def skip_matcher(config):
+    return matcher_for(config.get("skip", []))
+
+
+def delete_matcher(config):
+    return matcher_for(config.get("delete", []))
+
+
+def _naive(names, skip_list, delete_list):
+    ordered = sorted(delete_list, key=len, reverse=True)
+    out = []
+    for name in names:
+        if any(skip_str in name for skip_str in skip_list):
+            continue
+        for del_str in ordered:
+            if del_str in name:
+                name = name.replace(del_str, "").strip()
+        key = name
+        for del_str in ordered:
+            if del_str and del_str in key:
+                key = key.replace(del_str, " ")
+        out.append((name, re.sub(r"\s+", " ", key).strip()))
+    return out
+
+
+def _compiled(names, skip, delete):
+    out = []
+    for name in names:
+        if skip.search(name):
+            continue
+        name = delete.sub("", name, strip=True)
+        out.append((name, re.sub(r"\s+", " ", delete.sub(" ", name)).strip()))
+    return out
+
+
+def _sample(config, keywords, names, seed):
+    rng = random.Random(seed)
+    kana = [chr(c) for c in range(0x30A1, 0x30F6)]
+    skip = list(config.get("skip", []))
+    delete = list(config.get("delete", []))
+    while len(skip) + len(delete) < keywords:
+        word = "".join(rng.choice(kana) for _ in range(rng.randint(3, 8)))
+        if rng.random() < 0.1:
+            skip.append(f"{word}版")
+        else:
+            delete.append(rng.choice(["＜{}＞", "（{}付き）", "{}セット", "{}限定版"]).format(word))
+
+    # 首尾重叠的关键词对，以及删除较长关键词后会拼出的较短关键词
+    overlaps = []
+    for _ in range(max(1, keywords // 50)):
+        word = "".join(rng.choice(kana) for _ in range(8))
+        delete += [word[:4], word[2:], word[5:]]
+        overlaps.append(word)
+        inner = "".join(rng.choice(kana) for _ in range(5))
+        delete.append(inner)
+        overlaps.append(word[:3] + inner + word[3:6])
+        delete.append(word[:6])
+
+    samples = []
+    for _ in range(names):
+        name = "".join(rng.choice(kana) for _ in range(rng.randint(6, 20)))
+        roll = rng.random()
+        if roll < 0.3:
+            name = f"{name} {rng.choice(delete)}"
+        elif roll < 0.35 and skip:
+            name = f"{name} {rng.choice(skip)}"
+        elif roll < 0.45:
+            name = f"{name}{rng.choice(overlaps)}"
+        samples.append(name)
+    return skip, delete, samples
+
+
+def bench(config, keywords=500, names=5000, repeat=5, seed=0):
+    skip_list, delete_list, samples = _sample(config, keywords, names, seed)
+
+    started = time.perf_counter()
+    skip, delete = KeywordMatcher(skip_list), KeywordMatcher(delete_list)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        expected = _naive(samples, skip_list, delete_list)
+    naive_s = (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        actual = _compiled(samples, skip, delete)
+    compiled_s = (time.perf_counter() - started) / repeat
+
+    return {
+        "keywords": len(skip_list) + len(delete_list),
+        "names": len(samples),
+        "equivalent": expected == actual,
+        "build_ms": round(build_s * 1000, 2),
+        "naive_ms": round(naive_s * 1000, 2),
+        "compiled_ms": round(compiled_s * 1000, 2),
+        "speedup": round(naive_s / compiled_s, 1) if compiled_s else None,
+    }
+
+
+def main():
+    from .runtime import read_config
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, default=500)
+    parser.add_argument("--names", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    result = bench(read_config(), args.keywords, args.names, args.repeat)
+    sys.stdout.write(json.dumps(result, ensure_ascii=False, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
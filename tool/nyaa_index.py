@@ -0,0 +1,189 @@
+import logging
+import re
+
+from .db import connect, fts_phrase, has_table, like_pattern
+from .magnet_meta import parse_magnet
+from .models import NyaaData
+from .runtime import now_ts
+
+
+logger = logging.getLogger(__name__)
+
+LISTING_PATH = "/?f=0&c=1_3&p={page}"
+SEARCH_LIMIT = 75
+
+
+def _get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM nyaa_index_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO nyaa_index_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+
+def parse_listing(html):
+    from .parsers import extract_nyaa_rows, parse_nyaa_row
+
+    items = []
+    for row in extract_nyaa_rows(html):
+        nyaa_data = parse_nyaa_row(row)
+        if nyaa_data is None:
+            continue
+        nyaa_id = None
+        for a in row.select('a[href*="/view/"]'):
+            m = re.search(r"/view/(\d+)", a.attrs.get("href", ""))
+            if m:
+                nyaa_id = int(m.group(1))
+        if nyaa_id is not None:
+            items.append((nyaa_id, nyaa_data))
+    return items
+
+
+def _clear_resume(conn):
+    conn.execute("DELETE FROM nyaa_index_state WHERE key IN ('pending_max_id', 'resume_page', 'resume_target')")
+
+
+def sync_catalog(full=False, max_pages=None, db_path=None):
+    from . import http_client
+    from .core import NYAA_HOST
+
+    conn = connect(db_path)
+    cursor = conn.cursor()
+
+    # max_id 只在一次抓取完整结束后更新；中断的抓取从 resume_page 继续，
+    # 直到遇到 resume_target 或列表末尾，避免中间留下永远补不上的空洞
+    last_id = int(_get_state(conn, "max_id", 0) or 0)
+    resume_page = _get_state(conn, "resume_page")
+    if full:
+        _clear_resume(conn)
+        target = 0
+        newest_id = 0
+        page = 1
+    elif resume_page:
+        target = int(_get_state(conn, "resume_target", 0) or 0)
+        newest_id = int(_get_state(conn, "pending_max_id", 0) or 0)
+        page = int(resume_page)
+    else:
+        target = last_id
+        newest_id = last_id
+        page = 1
+    resumed = bool(resume_page) and not full
+    pages = 0
+    seen = 0
+    new = 0
+    complete = False
+    try:
+        while not max_pages or pages < max_pages:
+            response = http_client.get(f"https://{NYAA_HOST}" + LISTING_PATH.format(page=page))
+            response.raise_for_status()
+            items = parse_listing(response.text)
+            pages += 1
+            if not items:
+                complete = True
+                break
+
+            for nyaa_id, data in items:
+                infohash_hex = parse_magnet(data.link).get("infohash_hex") if data.link else None
+                cursor.execute(
+                    """
+                    INSERT INTO nyaa_torrents (id, name, size, date, magnet, infohash_hex)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        name = excluded.name,
+                        size = excluded.size,
+                        date = excluded.date,
+                        magnet = excluded.magnet,
+                        infohash_hex = excluded.infohash_hex
+                    """,
+                    (nyaa_id, data.name, data.size, data.date, data.link or None, infohash_hex),
+                )
+                seen += 1
+                if nyaa_id > last_id:
+                    new += 1
+                newest_id = max(newest_id, nyaa_id)
+
+            if target and min(nyaa_id for nyaa_id, _ in items) <= target:
+                complete = True
+                break
+            # 新发布的条目只会把旧条目推到后面的页，从记录的页码继续不会漏掉
+            _set_state(conn, "pending_max_id", newest_id)
+            _set_state(conn, "resume_page", page + 1)
+            _set_state(conn, "resume_target", target)
+            conn.commit()
+            logger.info("Nyaa索引第%s页完成，本页%s条，当前最大ID %s", page, len(items), newest_id)
+            page += 1
+
+        if complete:
+            _set_state(conn, "max_id", max(newest_id, last_id))
+            _clear_resume(conn)
+            _set_state(conn, "synced_at", now_ts())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        "pages": pages,
+        "seen": seen,
+        "new": new,
+        "max_id": max(newest_id, last_id) if complete else last_id or None,
+        "complete": complete,
+        "resumed": resumed,
+        "next_page": None if complete else page,
+    }
+
+
+def catalog_status(db_path=None):
+    conn = connect(db_path)
+    total = conn.execute("SELECT COUNT(*) FROM nyaa_torrents").fetchone()[0]
+    max_id = _get_state(conn, "max_id")
+    synced_at = _get_state(conn, "synced_at")
+    resume_page = _get_state(conn, "resume_page")
+    return {
+        "total": int(total or 0),
+        "max_id": int(max_id) if max_id else None,
+        "synced_at": int(synced_at) if synced_at else None,
+        "resume_page": int(resume_page) if resume_page else None,
+        "fts": has_table(conn, "nyaa_torrents_fts"),
+    }
+
+
+def search_catalog(conn, query, limit=SEARCH_LIMIT):
+    terms = [t for t in query.split() if t]
+    if not terms:
+        return []
+
+    fts_terms = [t for t in terms if len(t) >= 3]
+    if fts_terms and has_table(conn, "nyaa_torrents_fts"):
+        sql = (
+            "SELECT t.date, t.size, t.name, t.magnet FROM nyaa_torrents_fts f "
+            "JOIN nyaa_torrents t ON t.id = f.rowid WHERE nyaa_torrents_fts MATCH ?"
+        )
+        params = [" AND ".join(fts_phrase(t) for t in fts_terms)]
+        like_terms = [t for t in terms if len(t) < 3]
+    else:
+        sql = "SELECT t.date, t.size, t.name, t.magnet FROM nyaa_torrents t WHERE 1 = 1"
+        params = []
+        like_terms = terms
+
+    for term in like_terms:
+        sql += " AND t.name LIKE ? ESCAPE '\\'"
+        params.append(like_pattern(term))
+    sql += " ORDER BY t.date DESC LIMIT ?"
+    params.append(int(limit))
+
+    return [NyaaData(row[0], row[1], row[2], row[3] or "") for row in conn.execute(sql, params).fetchall()]
+
+
+def get_nyaa_data_local(game_name, company, conn):
+    game_name = re.sub(r"[-]", "", game_name)
+    nyaa_data_list = search_catalog(conn, f"{game_name} {company}")
+    if not nyaa_data_list:
+        keyword = re.sub(r"[^\w\s]", "", game_name)
+        keyword2 = re.sub(r"[-]", " ", company)
+        nyaa_data_list = search_catalog(conn, f"{keyword} {keyword2}")
+    return nyaa_data_list
@@ -1,11 +1,18 @@
 import base64
-import json
+import inspect
 import os
 import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-from .runtime import ensure_home_env, repo_root
+from .ratelimit import SharedTokenBucket
+from .runtime import ensure_home_env, read_config, repo_root, runtime_context
+
+OFFLINE_TASKS_TTL = 60.0
+RATE_LIMIT_KEY = "115"
 
 
 def _tool_dir():
@@ -20,17 +27,12 @@ def _import_p115client():
 
 
 def cookies_path():
-    config_path = os.path.join(_tool_dir(), "config.json")
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        custom_path = config.get("115_cookies_path")
-        if custom_path:
-            if os.path.isabs(custom_path):
-                return custom_path
-            return os.path.abspath(os.path.join(os.path.dirname(config_path), custom_path))
-    except Exception:
-        pass
+    context = runtime_context()
+    custom_path = context.config.get("115_cookies_path")
+    if custom_path:
+        if os.path.isabs(custom_path):
+            return custom_path
+        return os.path.abspath(os.path.join(os.path.dirname(context.config_path), custom_path))
     return os.path.join(_tool_dir(), "115-cookies.txt")
 
 
@@ -117,25 +119,117 @@ def load_client():
     return None
 
 
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class P115Session:
+    def __init__(self, client=None, qps=0, burst=1, request_timeout=None):
+        self.client = client if client is not None else load_client()
+        self.request_timeout = request_timeout
+        # 速率上限保存在 SQLite 中，多个校验任务与目录同步共用同一个 115 请求配额
+        self._bucket = SharedTokenBucket(RATE_LIMIT_KEY, qps, burst) if qps and float(qps) > 0 else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._offline_lock = threading.Lock()
+        self._cids = {}
+        self._offline = None
+        self._timeout_kwarg = {}
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config if config is not None else read_config()
+        return cls(
+            qps=float(config.get("115_qps", 2.0)),
+            burst=int(config.get("115_burst", 2)),
+            request_timeout=float(config.get("115_request_timeout", 20)),
+        )
+
+    @contextmanager
+    def deadline(self, seconds):
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = time.monotonic() + seconds if seconds else None
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def _remaining(self):
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is None:
+            return self.request_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("115 请求超时")
+        return min(remaining, self.request_timeout) if self.request_timeout else remaining
+
+    def call(self, method, *args, **kwargs):
+        _, check_response = _import_p115client()
+        if self._bucket is not None:
+            self._remaining()
+            self._bucket.acquire()
+        timeout = self._remaining()
+        func = getattr(self.client, method)
+        if timeout and self._accepts_timeout(method, func):
+            kwargs["timeout"] = timeout
+        return check_response(func(*args, **kwargs))
+
+    def _accepts_timeout(self, method, func):
+        # 旧版 p115client 的部分方法不接受 timeout 参数，调用前按签名判断一次
+        if method not in self._timeout_kwarg:
+            try:
+                params = inspect.signature(func).parameters.values()
+            except (TypeError, ValueError):
+                params = ()
+            self._timeout_kwarg[method] = any(
+                p.name == "timeout" or p.kind is inspect.Parameter.VAR_KEYWORD for p in params
+            )
+        return self._timeout_kwarg[method]
+
+    def resolve_cid(self, path):
+        with self._lock:
+            if path not in self._cids:
+                cid = _resolve_path_to_cid(path, self)
+                if not cid:
+                    return cid
+                self._cids[path] = cid
+            return self._cids[path]
+
+    def offline_tasks(self):
+        with self._offline_lock:
+            if self._offline is not None and time.monotonic() - self._offline[0] < OFFLINE_TASKS_TTL:
+                return self._offline[1]
+            ol = offline_list(self)
+            if not ol.get("success"):
+                return None
+            tasks = ol.get("tasks", [])
+            if isinstance(tasks, dict):
+                tasks = tasks.get("data", [])
+            urls = [(task.get("url") or "").lower() for task in tasks if isinstance(task, dict)]
+            self._offline = (time.monotonic(), urls)
+            return urls
+
+
 def get_login_status():
-    import requests
+    from . import http_client
     cookie = _read_cookie_string()
     if not cookie:
         return {"logged_in": False, "user": None, "reason": "cookie文件不存在"}
     try:
-        sess = requests.Session()
-        sess.headers.update({
-            "Accept": "application/json, text/plain, */*",
-            "Referer": "https://115.com/",
-            "User-Agent": "Mozilla/5.0",
-        })
-
-        for k, v in _cookie_header_to_dict(cookie).items():
-            sess.cookies.set(k, v, domain=".115.com", path="/")
+        req = {
+            "headers": {
+                "Accept": "application/json, text/plain, */*",
+                "Referer": "https://115.com/",
+                "User-Agent": "Mozilla/5.0",
+            },
+            "cookies": _cookie_header_to_dict(cookie),
+            "timeout": 10,
+        }
 
-        sess.get("https://webapi.115.com/", timeout=10)
+        warmup = http_client.get("https://webapi.115.com/", **req)
+        req["cookies"] = {**warmup.cookies.get_dict(), **req["cookies"]}
 
-        index_resp = sess.get("https://webapi.115.com/files/index_info", timeout=10)
+        index_resp = http_client.get("https://webapi.115.com/files/index_info", **req)
         index_resp.raise_for_status()
         index_body = index_resp.json()
         if isinstance(index_body, dict) and index_body.get("state") in (False, 0):
@@ -155,7 +249,7 @@ def get_login_status():
         user = ""
         user_id = None
         try:
-            info_resp = sess.get("https://webapi.115.com/user/info", timeout=10)
+            info_resp = http_client.get("https://webapi.115.com/user/info", **req)
             info_resp.raise_for_status()
             body = info_resp.json()
             if isinstance(body, dict) and body.get("state") in (False, 0):
@@ -173,7 +267,7 @@ def get_login_status():
 
         if not user:
             try:
-                info2 = sess.get("https://webapi.115.com/user/get_info", timeout=10)
+                info2 = http_client.get("https://webapi.115.com/user/get_info", **req)
                 if info2.status_code == 200:
                     body2 = info2.json()
                     user = _deep_find_first_str(body2, name_keys) or user
@@ -190,13 +284,13 @@ def get_login_status():
 
 
 def qr_login_step1():
-    import requests
-    resp = requests.get("https://qrcodeapi.115.com/api/1.0/web/1.0/token/")
+    from . import http_client
+    resp = http_client.get("https://qrcodeapi.115.com/api/1.0/web/1.0/token/")
     data = resp.json()
     data = data.get("data") or data
     uid = data["uid"]
     qrcode_url = f"https://qrcodeapi.115.com/api/1.0/mac/1.0/qrcode?uid={uid}"
-    img_resp = requests.get(qrcode_url)
+    img_resp = http_client.get(qrcode_url)
     img_b64 = base64.b64encode(img_resp.content).decode("ascii")
     return {
         "uid": uid,
@@ -207,9 +301,9 @@ def qr_login_step1():
 
 
 def qr_login_step2(uid, time, sign):
-    import requests
+    from . import http_client
     url = "https://qrcodeapi.115.com/get/status/"
-    resp = requests.get(url, params={"uid": uid, "time": time, "sign": sign})
+    resp = http_client.get(url, params={"uid": uid, "time": time, "sign": sign})
     status = resp.json()
     data = status.get("data") or status
     code = data.get("status")
@@ -224,11 +318,11 @@ def qr_login_step2(uid, time, sign):
 
 
 def qr_login_step3(uid, app="alipaymini"):
-    import requests
+    from . import http_client
     try:
         url = f"https://passportapi.115.com/app/1.0/{app}/1.0/login/qrcode/"
         payload = {"app": app, "account": uid}
-        resp = requests.post(url, data=payload)
+        resp = http_client.post(url, data=payload)
         body = resp.json()
         body_data = body.get("data") or body
         cookie = body_data.get("cookie") or ""
@@ -259,18 +353,17 @@ def qr_login_step3(uid, app="alipaymini"):
 
 
 def offline_submit(magnet, save_path):
-    client = load_client()
-    if client is None:
+    session = P115Session()
+    if session.client is None:
         return {"success": False, "message": "未登录"}
     try:
-        _, check_response = _import_p115client()
         cid = 0
         if save_path:
-            cid = _resolve_path_to_cid(save_path)
+            cid = _resolve_path_to_cid(save_path, session)
         payload = {"url": magnet}
         if cid:
             payload["wp_path_id"] = cid
-        resp = check_response(client.offline_add_url(payload))
+        resp = session.call("offline_add_url", payload)
         pick_code = None
         if isinstance(resp, dict):
             data = resp.get("data") if isinstance(resp.get("data"), dict) else resp
@@ -280,13 +373,12 @@ def offline_submit(magnet, save_path):
         return {"success": False, "message": str(e)}
 
 
-def offline_list():
-    client = load_client()
-    if client is None:
+def offline_list(session=None):
+    session = session or P115Session()
+    if session.client is None:
         return {"success": False, "message": "未登录", "tasks": []}
     try:
-        _, check_response = _import_p115client()
-        resp = check_response(client.offline_list({"page": 1, "page_size": 100}))
+        resp = session.call("offline_list", {"page": 1, "page_size": 100})
         tasks = []
         if isinstance(resp, dict):
             for k in ("tasks", "data", "list"):
@@ -303,17 +395,18 @@ def offline_list():
                     if tasks:
                         break
         return {"success": True, "tasks": tasks, "response": resp}
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return {"success": False, "message": str(e), "tasks": []}
 
 
-def _resolve_path_to_cid(path):
-    client = load_client()
-    if client is None:
+def _resolve_path_to_cid(path, session=None):
+    session = session or P115Session()
+    if session.client is None:
         return 0
     try:
-        _, check_response = _import_p115client()
-        resp = check_response(client.fs_dir_getid(path))
+        resp = session.call("fs_dir_getid", path)
         if not isinstance(resp, dict):
             return 0
         data = resp.get("data") if isinstance(resp.get("data"), dict) else resp
@@ -322,31 +415,28 @@ def _resolve_path_to_cid(path):
             return int(cid)
         except Exception:
             return 0
+    except DeadlineExceeded:
+        raise
     except Exception:
         return 0
 
 
-def search_files(keyword, cid=0):
-    client = load_client()
-    if client is None:
+def search_files(keyword, cid=0, session=None):
+    session = session or P115Session()
+    if session.client is None:
         return []
     try:
-        _, check_response = _import_p115client()
-        resp = check_response(client.fs_search(keyword, cid=cid))
+        resp = session.call("fs_search", keyword, cid=cid)
         data = resp if isinstance(resp, list) else resp.get("data", []) if isinstance(resp, dict) else []
         return data
+    except DeadlineExceeded:
+        raise
     except Exception:
         return []
 
 
 def _get_default_save_path():
-    config_path = os.path.join(_tool_dir(), "config.json")
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        return config.get("115_save_path", "")
-    except Exception:
-        return ""
+    return read_config().get("115_save_path", "")
 
 
 def parse_magnet_simple(magnet):
@@ -429,7 +519,21 @@ def _search_keyword_from_dn(dn):
     return name.strip()[:30]
 
 
-def check_magnet_exists(magnet, save_path):
+def _match_files(files, norm_dn):
+    matched = []
+    for f in files:
+        fname = f.get("n", "") if isinstance(f, dict) else ""
+        norm_fname = _normalize_for_comparison(fname)
+        if norm_dn and norm_fname and (norm_dn in norm_fname or norm_fname in norm_dn):
+            matched.append({
+                "name": fname,
+                "size": f.get("s") if isinstance(f, dict) else None,
+                "pick_code": f.get("pc") if isinstance(f, dict) else None,
+            })
+    return matched
+
+
+def check_magnet_exists(magnet, save_path, session=None):
     parsed = parse_magnet_simple(magnet)
     if not parsed.get("ok"):
         return {
@@ -441,6 +545,7 @@ def check_magnet_exists(magnet, save_path):
             "message": "磁链解析失败: " + ", ".join(parsed.get("errors", [])),
         }
 
+    session = session or P115Session()
     infohash_hex = parsed.get("infohash_hex")
     dn = parsed.get("dn", "")
 
@@ -448,82 +553,39 @@ def check_magnet_exists(magnet, save_path):
     in_offline = False
     confidence = "none"
 
-    ol = offline_list()
-    if ol.get("success"):
-        tasks = ol.get("tasks", [])
-        if isinstance(tasks, dict):
-            tasks = tasks.get("data", []) if isinstance(tasks, dict) else []
-        for task in tasks:
-            if isinstance(task, dict):
-                task_url = (task.get("url") or "").lower()
-                if magnet.lower() in task_url or (infohash_hex and infohash_hex in task_url):
-                    in_offline = True
-                    break
+    task_urls = session.offline_tasks()
+    if task_urls:
+        magnet_lower = magnet.lower()
+        in_offline = any(magnet_lower in url or (infohash_hex and infohash_hex in url) for url in task_urls)
 
+    cid = 0
     if dn:
         actual_save_path = save_path or _get_default_save_path()
-        cid = _resolve_path_to_cid(actual_save_path) if actual_save_path else 0
+        cid = session.resolve_cid(actual_save_path) if actual_save_path else 0
         keyword = _search_keyword_from_dn(dn)
         norm_dn = _normalize_for_comparison(dn)
-        if cid is not None:
-            files = search_files(keyword, cid)
-            for f in files:
-                fname = f.get("n", "") if isinstance(f, dict) else ""
-                norm_fname = _normalize_for_comparison(fname)
-                if norm_dn and norm_fname and (norm_dn in norm_fname or norm_fname in norm_dn):
-                    matched_files.append({
-                        "name": fname,
-                        "size": f.get("s") if isinstance(f, dict) else None,
-                        "pick_code": f.get("pc") if isinstance(f, dict) else None,
-                    })
-
-            if not files and not matched_files:
-                brackets = re.findall(r'\[(\d{6})\]', dn)
-                date_code = brackets[0] if brackets else ""
-                if date_code:
-                    files = search_files(date_code, cid or 0)
-                    for f in files:
-                        fname = f.get("n", "") if isinstance(f, dict) else ""
-                        norm_fname = _normalize_for_comparison(fname)
-                        if norm_dn and norm_fname and (norm_dn in norm_fname or norm_fname in norm_dn):
-                            matched_files.append({
-                                "name": fname,
-                                "size": f.get("s") if isinstance(f, dict) else None,
-                                "pick_code": f.get("pc") if isinstance(f, dict) else None,
-                            })
-
-            if not files and not matched_files:
-                name_no_bracket = re.split(r'\s*\+\s*', dn)[0]
-                first_bracket = name_no_bracket.find('[')
-                if first_bracket > 0:
-                    name_no_bracket = name_no_bracket[first_bracket:]
-                name_no_bracket = re.sub(r'\[[^\]]+\]', '', name_no_bracket).strip()
-                if len(name_no_bracket) >= 3:
-                    files = search_files(name_no_bracket[:20], cid or 0)
-                    for f in files:
-                        fname = f.get("n", "") if isinstance(f, dict) else ""
-                        norm_fname = _normalize_for_comparison(fname)
-                        if norm_dn and norm_fname and (norm_dn in norm_fname or norm_fname in norm_dn):
-                            matched_files.append({
-                                "name": fname,
-                                "size": f.get("s") if isinstance(f, dict) else None,
-                                "pick_code": f.get("pc") if isinstance(f, dict) else None,
-                            })
+        files = search_files(keyword, cid, session)
+        matched_files = _match_files(files, norm_dn)
+
+        if not files and not matched_files:
+            brackets = re.findall(r'\[(\d{6})\]', dn)
+            date_code = brackets[0] if brackets else ""
+            if date_code:
+                files = search_files(date_code, cid or 0, session)
+                matched_files = _match_files(files, norm_dn)
+
+        if not files and not matched_files:
+            name_no_bracket = re.split(r'\s*\+\s*', dn)[0]
+            first_bracket = name_no_bracket.find('[')
+            if first_bracket > 0:
+                name_no_bracket = name_no_bracket[first_bracket:]
+            name_no_bracket = re.sub(r'\[[^\]]+\]', '', name_no_bracket).strip()
+            if len(name_no_bracket) >= 3:
+                files = search_files(name_no_bracket[:20], cid or 0, session)
+                matched_files = _match_files(files, norm_dn)
 
         if not matched_files and not in_offline and infohash_hex:
-            try:
-                broad = search_files(infohash_hex[:12], cid or 0)
-                for f in broad:
-                    fname = f.get("n", "") if isinstance(f, dict) else ""
-                    norm_fname = _normalize_for_comparison(fname)
-                    if norm_dn and norm_fname and (norm_dn in norm_fname or norm_fname in norm_dn):
-                        matched_files.append({
-                            "name": fname,
-                            "size": f.get("s") if isinstance(f, dict) else None,
-                            "pick_code": f.get("pc") if isinstance(f, dict) else None,
-                        })
-            except Exception:
-                pass
+            matched_files = _match_files(search_files(infohash_hex[:12], cid or 0, session), norm_dn)
 
     if matched_files:
         confidence = "high"
@@ -531,7 +593,7 @@ def check_magnet_exists(magnet, save_path):
         confidence = "high"
     elif dn and cid:
         keyword = _search_keyword_from_dn(dn)
-        broad = search_files(keyword[:max(8, len(keyword)//3)], cid)
+        broad = search_files(keyword[:max(8, len(keyword)//3)], cid, session)
         if broad:
             confidence = "low"
 
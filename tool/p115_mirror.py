@@ -0,0 +1,247 @@
+import logging
+
+from .db import connect, fts_phrase, has_table, like_pattern
+from .p115_client import _normalize_for_comparison, parse_magnet_simple
+from .runtime import now_ts, read_config
+
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+INCREMENTAL_NOTE = "增量同步只重新列出修改时间变化的目录及其子目录；115 不保证深层变化会更新上级目录的修改时间，如有遗漏请使用 --full"
+
+
+def _get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM p115_mirror_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO p115_mirror_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value)),
+    )
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry(item, parent_id):
+    is_dir = "fid" not in item
+    name = item.get("n") or ""
+    return (
+        _int(item.get("cid") if is_dir else item.get("fid")),
+        parent_id,
+        int(is_dir),
+        name,
+        _normalize_for_comparison(name),
+        _int(item.get("s")),
+        item.get("pc"),
+        item.get("sha"),
+        _int(item.get("te")),
+    )
+
+
+def _list_dir(session, cid):
+    offset = 0
+    while True:
+        resp = session.call("fs_files", {"cid": cid, "limit": PAGE_SIZE, "offset": offset, "show_dir": 1})
+        if not isinstance(resp, dict):
+            return
+        # 目录已被删除时 115 会返回根目录的内容
+        if _int(resp.get("cid")) not in (None, cid):
+            return
+        items = [item for item in resp.get("data") or [] if isinstance(item, dict)]
+        yield from items
+        offset += len(items)
+        if not items or offset >= (_int(resp.get("count")) or 0):
+            return
+
+
+def sync_mirror(full=False, save_path=None, session=None, db_path=None):
+    from .p115_client import P115Session
+
+    session = session or P115Session.from_config()
+    if session.client is None:
+        raise RuntimeError("115 未登录")
+    save_path = save_path if save_path is not None else read_config().get("115_save_path", "")
+    root_id = session.resolve_cid(save_path) if save_path else 0
+    if save_path and not root_id:
+        raise RuntimeError(f"115 目录不存在: {save_path}")
+
+    conn = connect(db_path)
+    if _get_state(conn, "root_id") != str(root_id):
+        conn.execute("DELETE FROM p115_files")
+        _set_state(conn, "root_id", root_id)
+        _set_state(conn, "root_path", save_path)
+        conn.commit()
+        full = True
+
+    listed = 0
+    removed = 0
+    queue = [root_id]
+    try:
+        while queue:
+            cid = queue.pop()
+            if not full and cid != root_id:
+                # 目录有变化时整棵子树一并重新列出，中断后也能继续
+                conn.execute(
+                    """
+                    WITH RECURSIVE subtree(id) AS (
+                        SELECT id FROM p115_files WHERE parent_id = ? AND is_dir = 1
+                        UNION ALL
+                        SELECT f.id FROM p115_files f JOIN subtree ON f.parent_id = subtree.id WHERE f.is_dir = 1
+                    )
+                    UPDATE p115_files SET listed_at = NULL WHERE id IN subtree
+                    """,
+                    (cid,),
+                )
+            seen = set()
+            for item in _list_dir(session, cid):
+                row = _entry(item, cid)
+                if row[0] is None:
+                    continue
+                seen.add(row[0])
+                # 修改时间变化的目录清空 listed_at，保证中断后仍会重新列出
+                conn.execute(
+                    """
+                    INSERT INTO p115_files (id, parent_id, is_dir, name, norm_name, size, pick_code, sha1, mtime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        parent_id = excluded.parent_id,
+                        is_dir = excluded.is_dir,
+                        name = excluded.name,
+                        norm_name = excluded.norm_name,
+                        size = excluded.size,
+                        pick_code = excluded.pick_code,
+                        sha1 = excluded.sha1,
+                        listed_at = CASE WHEN p115_files.mtime IS excluded.mtime THEN p115_files.listed_at END,
+                        mtime = excluded.mtime
+                    """,
+                    row,
+                )
+            gone = [
+                (file_id,)
+                for (file_id,) in conn.execute("SELECT id FROM p115_files WHERE parent_id = ?", (cid,)).fetchall()
+                if file_id not in seen
+            ]
+            conn.executemany("DELETE FROM p115_files WHERE id = ?", gone)
+            removed += len(gone)
+            conn.execute("UPDATE p115_files SET listed_at = ? WHERE id = ?", (now_ts(), cid))
+            conn.commit()
+            listed += 1
+
+            queue.extend(
+                file_id
+                for (file_id,) in conn.execute(
+                    "SELECT id FROM p115_files WHERE parent_id = ? AND is_dir = 1 AND (listed_at IS NULL OR ?)",
+                    (cid, int(bool(full))),
+                ).fetchall()
+            )
+            if listed % 100 == 0:
+                logger.info("115目录镜像已列出%s个目录，待处理%s个", listed, len(queue))
+            if not queue:
+                # 上次同步中断时留下的未列出目录
+                queue = [
+                    file_id
+                    for (file_id,) in conn.execute("SELECT id FROM p115_files WHERE is_dir = 1 AND listed_at IS NULL").fetchall()
+                ]
+
+        while True:
+            cur = conn.execute(
+                "DELETE FROM p115_files WHERE parent_id != ? AND parent_id NOT IN (SELECT id FROM p115_files WHERE is_dir = 1)",
+                (root_id,),
+            )
+            if cur.rowcount <= 0:
+                break
+            removed += cur.rowcount
+
+        _set_state(conn, "synced_at", now_ts())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    total = conn.execute("SELECT COUNT(*) FROM p115_files").fetchone()[0]
+    result = {"full": bool(full), "dirs_listed": listed, "removed": removed, "total": int(total or 0)}
+    if not full:
+        result["message"] = INCREMENTAL_NOTE
+    return result
+
+
+def mirror_status(db_path=None):
+    conn = connect(db_path)
+    files, dirs = conn.execute("SELECT COUNT(*), COALESCE(SUM(is_dir), 0) FROM p115_files").fetchone()
+    synced_at = _get_state(conn, "synced_at")
+    return {
+        "files": int(files or 0) - int(dirs or 0),
+        "dirs": int(dirs or 0),
+        "root_path": _get_state(conn, "root_path"),
+        "synced_at": int(synced_at) if synced_at else None,
+    }
+
+
+def _find_containing(conn, norm_dn):
+    if len(norm_dn) >= 3 and has_table(conn, "p115_files_fts"):
+        return conn.execute(
+            "SELECT f.name, f.size, f.pick_code FROM p115_files_fts t "
+            "JOIN p115_files f ON f.id = t.rowid WHERE p115_files_fts MATCH ?",
+            (fts_phrase(norm_dn),),
+        ).fetchall()
+    return conn.execute(
+        "SELECT name, size, pick_code FROM p115_files WHERE norm_name LIKE ? ESCAPE '\\'",
+        (like_pattern(norm_dn),),
+    ).fetchall()
+
+
+def _find_contained(conn, norm_dn):
+    # 名称较短的条目须至少覆盖磁链名称的一半，避免 "game" 之类的目录名误判。
+    # 从第 i 个字符开始的这类子串都落在 [norm_dn[i:i+min_len], norm_dn[i:]] 区间内，可走索引
+    min_len = (len(norm_dn) + 1) // 2
+    rows = []
+    for i in range(len(norm_dn) - min_len + 1):
+        for name, size, pick_code, norm_name in conn.execute(
+            "SELECT name, size, pick_code, norm_name FROM p115_files WHERE norm_name BETWEEN ? AND ?",
+            (norm_dn[i:i + min_len], norm_dn[i:]),
+        ):
+            if norm_dn.startswith(norm_name, i):
+                rows.append((name, size, pick_code))
+    return rows
+
+
+def find_files(conn, norm_dn):
+    if not norm_dn:
+        return []
+    rows = conn.execute("SELECT name, size, pick_code FROM p115_files WHERE norm_name = ?", (norm_dn,)).fetchall()
+    if not rows:
+        rows = _find_containing(conn, norm_dn) + _find_contained(conn, norm_dn)
+    return [{"name": name, "size": size, "pick_code": pick_code} for name, size, pick_code in rows]
+
+
+def check_magnet_local(magnet, conn=None):
+    parsed = parse_magnet_simple(magnet)
+    if not parsed.get("ok"):
+        return {
+            "exists": False,
+            "confidence": "none",
+            "infohash_hex": parsed.get("infohash_hex"),
+            "matched_files": [],
+            "in_offline_tasks": False,
+            "message": "磁链解析失败: " + ", ".join(parsed.get("errors", [])),
+        }
+
+    dn = parsed.get("dn") or ""
+    matched_files = find_files(conn or connect(), _normalize_for_comparison(dn)) if dn else []
+    return {
+        "exists": bool(matched_files),
+        "confidence": "high" if matched_files else "none",
+        "infohash_hex": parsed.get("infohash_hex"),
+        "matched_files": matched_files,
+        "in_offline_tasks": False,
+        "dn": dn,
+        "source": "mirror",
+    }
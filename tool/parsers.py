@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .models import NyaaData
+
+
+GETCHU_ROW_STRAINER = SoupStrainer("tr", attrs={"bgcolor": "#ffffff"})
+NYAA_ROW_STRAINER = SoupStrainer("tr")
+
+_features = None
+
+
+def html_features():
+    global _features
+    if _features is None:
+        try:
+            import lxml
+
+            _features = "lxml"
+        except ImportError:
+            _features = "html.parser"
+    return _features
+
+
+def extract_getchu_rows(html):
+    soup = BeautifulSoup(html, html_features(), parse_only=GETCHU_ROW_STRAINER)
+    return soup.find_all("tr", bgcolor="#ffffff")
+
+
+def extract_nyaa_rows(html):
+    soup = BeautifulSoup(html, html_features(), parse_only=NYAA_ROW_STRAINER)
+    return soup.find_all("tr")
+
+
+def parse_getchu_row(row):
+    columns = row.find_all("td")
+    if len(columns) < 3:
+        return None
+    return columns[1].text.strip(), columns[2].text.strip()
+
+
+def parse_nyaa_row(row):
+    cells = row.find_all("td")
+    if len(cells) < 5:
+        return None
+    link_views = cells[1].select('a[href*="view"]')
+    name_element = link_views[-1] if len(link_views) > 0 else None
+    name = name_element.attrs["title"] if name_element else cells[1].get_text(strip=True)
+
+    link_element = next(
+        (a for a in cells[2].select("a[href]") if "magnet:?xt=urn:btih:" in a.attrs["href"]),
+        None,
+    )
+    link = link_element.attrs["href"] if link_element else ""
+
+    size = cells[3].get_text(strip=True)
+    date_str = cells[4].get_text(strip=True)
+    try:
+        date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
+        date_str_formatted = date_obj.strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        date_str_formatted = None
+
+    return NyaaData(date_str_formatted, size, name, link)
+
+
+def _full_tree_rows(kind, html):
+    soup = BeautifulSoup(html, "html.parser")
+    if kind == "getchu":
+        return [parse_getchu_row(r) for r in soup.find_all("tr", bgcolor="#ffffff")]
+    return [parse_nyaa_row(r) for r in soup.find_all("tr")]
+
+
+def _strained_rows(kind, html):
+    if kind == "getchu":
+        return [parse_getchu_row(r) for r in extract_getchu_rows(html)]
+    return [parse_nyaa_row(r) for r in extract_nyaa_rows(html)]
+
+
+def _row_key(row):
+    if isinstance(row, NyaaData):
+        return (row.date, row.size, row.name, row.link)
+    return row
+
+
+def _measure(fn, kind, html, repeat):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = fn(kind, html)
+    elapsed = (time.perf_counter() - started) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def bench(kind, files, repeat=5):
+    results = []
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        full_rows, full_s, full_peak = _measure(_full_tree_rows, kind, html, repeat)
+        fast_rows, fast_s, fast_peak = _measure(_strained_rows, kind, html, repeat)
+        results.append(
+            {
+                "file": path,
+                "rows": len(fast_rows),
+                "equivalent": [_row_key(r) for r in full_rows] == [_row_key(r) for r in fast_rows],
+                "full_ms": round(full_s * 1000, 2),
+                "full_peak_kb": round(full_peak / 1024, 1),
+                "fast_ms": round(fast_s * 1000, 2),
+                "fast_peak_kb": round(fast_peak / 1024, 1),
+                "features": html_features(),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("kind", choices=["getchu", "nyaa"])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.stdout.write(json.dumps(bench(args.kind, args.files, args.repeat), ensure_ascii=False, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
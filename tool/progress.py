@@ -0,0 +1,77 @@
+import copy
+import json
+import threading
+import time
+
+from .runtime import now_ts, write_text_atomic
+
+
+DEFAULT_INTERVAL = 0.5
+# 任务行每次写入状态都取全局递增的修订号，长轮询据此判断是否有更新
+NEXT_REVISION = "revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM jobs)"
+
+
+class JsonFileBackend:
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, payload, progress):
+        write_text_atomic(self.path, payload)
+
+
+class SqliteJobBackend:
+    def __init__(self, conn, job_id, lock=None):
+        self._conn = conn
+        self._job_id = job_id
+        self._lock = lock or threading.Lock()
+
+    def write(self, payload, progress):
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, progress = ?, heartbeat_at = ?, {NEXT_REVISION} WHERE id = ?",
+                (payload, progress, now_ts(), self._job_id),
+            )
+            self._conn.commit()
+
+
+class ProgressReporter:
+    def __init__(self, backend, status=None, progress=None, interval=DEFAULT_INTERVAL):
+        self.backend = backend
+        self.status = status if status is not None else {}
+        self.progress = progress
+        self.interval = float(interval)
+        self.last_flush = 0.0
+        self._dirty = False
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def report(self, progress=None, force=False):
+        # 在修改状态的线程上复制快照，心跳线程刷新时只读取副本
+        with self._lock:
+            if progress is not None:
+                self.progress = float(progress)
+            self.status["updated_at"] = now_ts()
+            self._snapshot = copy.deepcopy(self.status)
+            self._dirty = True
+        if not force and time.monotonic() - self.last_flush < self.interval:
+            return False
+        return self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return False
+            payload = json.dumps(self._snapshot, ensure_ascii=False)
+            self._dirty = False
+            self.last_flush = time.monotonic()
+            self.backend.write(payload, self.progress)
+        return True
+
+    def flush_if_due(self):
+        if self._dirty and time.monotonic() - self.last_flush >= self.interval:
+            return self.flush()
+        return False
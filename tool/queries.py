@@ -0,0 +1,279 @@
+import base64
+import html
+import json
+
+from .db import connect, fts_phrase, has_table, like_pattern
+from .models import GetchuGame, NyaaData
+from .runtime import runtime_paths
+
+
+GAME_COLUMNS = """
+    date,
+    name,
+    company,
+    link as download_url,
+    nyaa_name,
+    comment,
+    COALESCE(downloaded, 0) as downloaded,
+    infohash_hex
+"""
+
+
+def _row_to_game(row):
+    return GetchuGame(row[0], row[1], row[2], None, row[3], row[4], row[5], row[6], row[7])
+
+
+def get_db_path(default=None):
+    paths = runtime_paths()
+    return paths["db_path"] if paths.get("db_path") else default
+
+
+def set_downloaded_status(date, name, downloaded=1, infohash_hex=None, db_path=None):
+    conn = connect(db_path)
+    with conn:
+        if infohash_hex:
+            conn.execute(
+                "UPDATE getchu_games SET downloaded = ?, infohash_hex = ? WHERE date = ? AND name = ?",
+                (downloaded, infohash_hex, date, name),
+            )
+        else:
+            conn.execute(
+                "UPDATE getchu_games SET downloaded = ? WHERE date = ? AND name = ?",
+                (downloaded, date, name),
+            )
+
+
+def update_game_record(date, name, new_date=None, new_name=None, new_company=None, new_link=None, new_downloaded=None, new_nyaa_name=None, db_path=None):
+    fields = {}
+    if new_date is not None and new_date != date:
+        fields["date"] = new_date
+    if new_name is not None:
+        fields["name"] = new_name
+    if new_company is not None:
+        fields["company"] = new_company
+    if new_link is not None:
+        fields["link"] = new_link
+    if new_downloaded is not None:
+        fields["downloaded"] = 1 if new_downloaded else 0
+    if new_nyaa_name is not None:
+        fields["nyaa_name"] = new_nyaa_name
+    if not fields:
+        return False
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    values = list(fields.values()) + [date, name]
+    conn = connect(db_path)
+    with conn:
+        cursor = conn.execute(f"UPDATE getchu_games SET {sets} WHERE date = ? AND name = ?", values)
+        if cursor.rowcount and ("date" in fields or "name" in fields):
+            conn.execute(
+                "UPDATE nyaa_candidates SET game_date = ?, game_name = ? WHERE game_date = ? AND game_name = ?",
+                (fields.get("date", date), fields.get("name", name), date, name),
+            )
+    return cursor.rowcount > 0
+
+
+def delete_game_record(date, name, db_path=None):
+    conn = connect(db_path)
+    with conn:
+        cursor = conn.execute("DELETE FROM getchu_games WHERE date = ? AND name = ?", (date, name))
+        conn.execute("DELETE FROM nyaa_candidates WHERE game_date = ? AND game_name = ?", (date, name))
+    return cursor.rowcount > 0
+
+
+def save_candidates(conn, date, name, nyaa_data_list, fetched_at=None):
+    from .magnet_meta import parse_magnet
+
+    rows = []
+    for data in nyaa_data_list:
+        infohash_hex = parse_magnet(data.link).get("infohash_hex") if data.link else None
+        if infohash_hex:
+            rows.append((date, name, infohash_hex, data.name, data.size, data.date, data.link, fetched_at))
+    conn.executemany(
+        """
+        INSERT INTO nyaa_candidates (game_date, game_name, infohash_hex, name, size, date, magnet, fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(game_date, game_name, infohash_hex) DO UPDATE SET
+            name = excluded.name,
+            size = excluded.size,
+            date = excluded.date,
+            magnet = excluded.magnet,
+            fetched_at = excluded.fetched_at
+        """,
+        rows,
+    )
+    return len(rows)
+
+
+def load_candidates(conn, date, name):
+    rows = conn.execute(
+        "SELECT date, size, name, magnet FROM nyaa_candidates WHERE game_date = ? AND game_name = ? ORDER BY date DESC, name",
+        (date, name),
+    ).fetchall()
+    return [NyaaData(row[0], row[1], row[2], row[3] or "") for row in rows]
+
+
+def list_candidates(date, name):
+    conn = connect()
+    game = conn.execute("SELECT link FROM getchu_games WHERE date = ? AND name = ?", (date, name)).fetchone()
+    if game is None:
+        return None
+    rows = conn.execute(
+        """
+        SELECT infohash_hex, name, size, date, magnet, fetched_at FROM nyaa_candidates
+        WHERE game_date = ? AND game_name = ?
+        ORDER BY date DESC, name
+        """,
+        (date, name),
+    ).fetchall()
+    return [
+        {
+            "infohash_hex": row[0],
+            "name": row[1],
+            "size": row[2],
+            "date": row[3],
+            "link": row[4],
+            "fetched_at": row[5],
+            "selected": bool(game[0]) and row[4] == game[0],
+        }
+        for row in rows
+    ]
+
+
+def bulk_insert_games(conn, games):
+    rows = [(game.date, game.name, game.company) for game in games]
+    if not rows:
+        return 0, 0
+    cursor = conn.executemany("INSERT OR IGNORE INTO getchu_games (date, name, company) VALUES (?,?,?)", rows)
+    inserted = max(cursor.rowcount, 0)
+    return inserted, len(rows) - inserted
+
+
+def get_years_list():
+    conn = connect()
+    cursor = conn.execute("SELECT DISTINCT year FROM getchu_games ORDER BY year DESC")
+    return [int(row[0]) for row in cursor.fetchall()]
+
+
+def get_games_data():
+    conn = connect()
+    cursor = conn.execute(f"SELECT {GAME_COLUMNS} FROM getchu_games ORDER BY year DESC, month DESC, name")
+    return [_row_to_game(row) for row in cursor.fetchall()]
+
+
+def encode_page_cursor(game):
+    raw = json.dumps([game.year, game.month, game.name], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        year, month, name = json.loads(raw.decode("utf-8"))
+        return int(year), int(month), str(name)
+    except TypeError as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def query_games_page(year=None, month=None, page=1, per_page=50, cursor=None):
+    where = []
+    params = []
+    if year:
+        where.append("year = ?")
+        params.append(int(year))
+    if month:
+        where.append("month = ?")
+        params.append(int(month))
+
+    conn = connect()
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    total = conn.execute(f"SELECT COUNT(*) FROM getchu_games {where_sql}", params).fetchone()[0]
+
+    offset = (max(1, int(page)) - 1) * per_page
+    if cursor:
+        c_year, c_month, c_name = decode_page_cursor(cursor)
+        # 前导的 year <= ? 让查询计划直接定位到游标位置，而不是扫描之前的所有行
+        where.append("year <= ? AND (year < ? OR (year = ? AND (month < ? OR (month = ? AND name > ?))))")
+        params += [c_year, c_year, c_year, c_month, c_month, c_name]
+        where_sql = f"WHERE {' AND '.join(where)}"
+        offset = 0
+
+    rows = conn.execute(
+        f"SELECT {GAME_COLUMNS} FROM getchu_games {where_sql} ORDER BY year DESC, month DESC, name LIMIT ? OFFSET ?",
+        params + [int(per_page), offset],
+    ).fetchall()
+    games = [_row_to_game(row) for row in rows]
+    next_cursor = encode_page_cursor(games[-1]) if len(games) == per_page else None
+    return games, int(total or 0), next_cursor
+
+
+def get_latest_month():
+    row = connect().execute(
+        "SELECT year, month FROM getchu_games ORDER BY year DESC, month DESC LIMIT 1"
+    ).fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+SEARCH_COLUMNS = """
+    g.date,
+    g.name,
+    g.company,
+    g.link,
+    g.nyaa_name,
+    g.comment,
+    COALESCE(g.downloaded, 0),
+    g.infohash_hex
+"""
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+
+
+def _highlight(text):
+    if not text:
+        return ""
+    return html.escape(text).replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>")
+
+
+def search_games(query, page=1, per_page=50, year=None, month=None):
+    terms = [t for t in (query or "").split() if t]
+    if not terms:
+        return [], 0
+
+    conn = connect()
+    fts_terms = [t for t in terms if len(t) >= 3]
+    if fts_terms and has_table(conn, "getchu_games_fts"):
+        source = "getchu_games_fts f JOIN getchu_games g ON g.id = f.rowid"
+        where = ["getchu_games_fts MATCH ?"]
+        params = [" AND ".join(fts_phrase(t) for t in fts_terms)]
+        snippet = f"snippet(getchu_games_fts, -1, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', 16)"
+        order = "bm25(getchu_games_fts), g.year DESC, g.month DESC"
+        like_terms = [t for t in terms if len(t) < 3]
+    else:
+        source = "getchu_games g"
+        where = []
+        params = []
+        snippet = "NULL"
+        order = "g.year DESC, g.month DESC, g.name"
+        like_terms = terms
+
+    for term in like_terms:
+        where.append("(g.name LIKE ? ESCAPE '\\' OR g.company LIKE ? ESCAPE '\\' OR g.nyaa_name LIKE ? ESCAPE '\\')")
+        params += [like_pattern(term)] * 3
+    if year:
+        where.append("g.year = ?")
+        params.append(int(year))
+    if month:
+        where.append("g.month = ?")
+        params.append(int(month))
+
+    where_sql = " AND ".join(where) if where else "1 = 1"
+    total = conn.execute(f"SELECT COUNT(*) FROM {source} WHERE {where_sql}", params).fetchone()[0]
+    offset = (max(1, int(page)) - 1) * per_page
+    rows = conn.execute(
+        f"SELECT {SEARCH_COLUMNS}, {snippet} FROM {source} WHERE {where_sql} ORDER BY {order} LIMIT ? OFFSET ?",
+        params + [int(per_page), offset],
+    ).fetchall()
+    results = []
+    for row in rows:
+        game = _row_to_game(row)
+        results.append((game, _highlight(row[8]) if row[8] else html.escape(game.name or "")))
+    return results, int(total or 0)
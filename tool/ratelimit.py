@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    # 令牌数保存在 SQLite 中，同一主机的多个任务进程共用一个速率上限
+    def __init__(self, key, rate, burst=1, db_path=None):
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self._db_path = db_path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            from .db import open_connection
+
+            self._conn = open_connection(self._db_path)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _take(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE key = ?", (self.key,)).fetchone()
+            tokens, updated = row if row else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            granted = tokens >= 1
+            if granted:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO rate_limits (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (self.key, tokens, now),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return granted, 0.0 if granted else (1 - tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                granted, wait = self._take()
+            if granted:
+                return
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _host_of(url_or_host):
+    if "://" in url_or_host:
+        return (urlsplit(url_or_host).hostname or "").lower()
+    return url_or_host.lower()
+
+
+def configure_host(host, rate, burst=1, shared=False):
+    host = _host_of(host)
+    with _buckets_lock:
+        if rate and float(rate) > 0:
+            _buckets[host] = SharedTokenBucket(host, rate, burst) if shared else TokenBucket(rate, burst)
+        else:
+            _buckets.pop(host, None)
+
+
+def limiter_for(url_or_host):
+    with _buckets_lock:
+        return _buckets.get(_host_of(url_or_host))
+
+
+def acquire(url_or_host):
+    bucket = limiter_for(url_or_host)
+    if bucket is not None:
+        bucket.acquire()
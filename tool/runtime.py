@@ -2,6 +2,7 @@ import json
 import os
 import signal
 import tempfile
+import threading
 import time
 
 
@@ -35,18 +36,27 @@ def _abs_from_root(path):
     return os.path.abspath(os.path.join(repo_root(), path))
 
 
-def read_config(config_path=None):
-    if config_path is None:
-        config_path = os.path.join(_tool_dir(), "config.json")
+def config_path():
+    return os.environ.get("GAL_CONFIG") or os.path.join(_tool_dir(), "config.json")
+
+
+def _load_config(path):
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception:
         return {}
 
 
-def runtime_paths(config_path=None):
-    config = read_config(config_path)
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _resolve_paths(config):
     db_path = _abs_from_root(config.get("db_path", "getchu.db"))
     status_dir = _abs_from_root(config.get("status_dir", "status"))
     log_path = _abs_from_root(config.get("log_path", os.path.join("logs", "app.log")))
@@ -59,9 +69,74 @@ def runtime_paths(config_path=None):
         "spider_status_path": os.path.join(status_dir, "spider_status.json"),
         "download_status_path": os.path.join(status_dir, "download_status.json"),
         "check_all_status_path": os.path.join(status_dir, "check_all_status.json"),
+        "scheduler_status_path": os.path.join(status_dir, "scheduler.json"),
+        "http_cache_dir": os.path.join(status_dir, "http_cache"),
+        "daemon_socket_path": _abs_from_root(config.get("daemon_socket") or os.path.join(status_dir, "cli.sock")),
     }
 
 
+class RuntimeContext:
+    def __init__(self, path, stamp, config):
+        self.config_path = path
+        self.stamp = stamp
+        self.config = config
+        self.paths = _resolve_paths(config)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key, factory):
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = factory(self.config)
+        return value
+
+    @property
+    def skip_matcher(self):
+        from .matcher import skip_matcher
+
+        return self.derived("skip_matcher", skip_matcher)
+
+    @property
+    def delete_matcher(self):
+        from .matcher import delete_matcher
+
+        return self.derived("delete_matcher", delete_matcher)
+
+    @property
+    def scorer(self):
+        from .scoring import get_scorer
+
+        return self.derived("scorer", get_scorer)
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def runtime_context(path=None):
+    path = os.path.abspath(path or config_path())
+    stamp = _file_stamp(path)
+    context = _contexts.get(path)
+    if context is not None and context.stamp == stamp:
+        return context
+    with _contexts_lock:
+        context = _contexts.get(path)
+        if context is None or context.stamp != stamp:
+            context = _contexts[path] = RuntimeContext(path, stamp, _load_config(path))
+    return context
+
+
+def read_config(config_path=None):
+    return runtime_context(config_path).config
+
+
+def runtime_paths(config_path=None):
+    return runtime_context(config_path).paths
+
+
 def ensure_parent_dir(path):
     parent = os.path.dirname(path)
     if parent:
@@ -80,13 +155,13 @@ def read_json(path, default):
         return default
 
 
-def write_json_atomic(path, data):
+def write_text_atomic(path, text):
     ensure_parent_dir(path)
     dir_path = os.path.dirname(path) or "."
     fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=dir_path)
     try:
         with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False)
+            f.write(text)
         os.replace(tmp_path, path)
     finally:
         try:
@@ -96,6 +171,10 @@ def write_json_atomic(path, data):
             pass
 
 
+def write_json_atomic(path, data):
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False))
+
+
 def pid_is_running(pid):
     if not pid:
         return False
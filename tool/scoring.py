@@ -0,0 +1,133 @@
+import re
+import threading
+from datetime import date
+
+
+DEFAULT_UPLOADERS = {"girlcelly": 30.0, "2D.G.F.": 20.0}
+MIN_SCORE = 50.0
+
+DATE_CODE_WEIGHT = 50.0
+SIMILARITY_WEIGHT = 20.0
+UPLOAD_DATE_WEIGHT = 15.0
+EARLY_UPLOAD_PENALTY = -10.0
+# 发布时间在发售月前后该天数范围内视为正常，超出后逐年衰减
+UPLOAD_WINDOW = (-31, 62)
+UPLOAD_DECAY_DAYS = 365.0
+# (大小上限, 得分)，按顺序匹配
+SIZE_RULES = (
+    (100 << 20, -20.0),
+    (500 << 20, -5.0),
+    (200 << 30, 5.0),
+    (None, -10.0),
+)
+
+_SIZE_RE = re.compile(r"([\d.]+)\s*([KMGT])i?B", re.I)
+_SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+_NOISE_RE = re.compile(r"[\W_]+")
+
+
+def parse_size(text):
+    if not text:
+        return None
+    m = _SIZE_RE.search(text)
+    if not m:
+        return None
+    try:
+        return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+    except ValueError:
+        return None
+
+
+def _ordinal(text):
+    try:
+        return date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def _bigrams(text):
+    text = _NOISE_RE.sub("", (text or "").lower())
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _size_score(size_bytes):
+    if size_bytes is None:
+        return 0.0
+    for limit, score in SIZE_RULES:
+        if limit is None or size_bytes < limit:
+            return score
+    return 0.0
+
+
+def _upload_score(uploaded, release):
+    if uploaded is None:
+        return 0.0
+    delta = uploaded - release
+    low, high = UPLOAD_WINDOW
+    if delta < low:
+        return EARLY_UPLOAD_PENALTY
+    if delta <= high:
+        return UPLOAD_DATE_WEIGHT
+    return UPLOAD_DATE_WEIGHT * max(0.0, 1 - (delta - high) / UPLOAD_DECAY_DAYS)
+
+
+class CandidateScorer:
+    def __init__(self, uploaders=None, min_score=MIN_SCORE):
+        self.uploaders = {str(k): float(v) for k, v in (DEFAULT_UPLOADERS if uploaders is None else uploaders).items()}
+        self.min_score = float(min_score)
+        names = sorted(self.uploaders, key=len, reverse=True)
+        self._uploader_re = re.compile("|".join(re.escape(name) for name in names)) if names else None
+
+    def context(self, game_name, year, month):
+        return f"{str(year)[-2:]}{int(month):02d}", date(int(year), int(month), 1).toordinal(), _bigrams(game_name)
+
+    def score(self, candidate, context):
+        date_code, release, game_grams = context
+        name = candidate.name or ""
+        total = DATE_CODE_WEIGHT if date_code in name else 0.0
+        if self._uploader_re is not None:
+            total += max((self.uploaders[m.group(0)] for m in self._uploader_re.finditer(name)), default=0.0)
+        if game_grams:
+            total += SIMILARITY_WEIGHT * len(game_grams & _bigrams(name)) / len(game_grams)
+        total += _upload_score(_ordinal(candidate.date), release)
+        total += _size_score(parse_size(candidate.size))
+        return total
+
+    def rank(self, candidates, game_name, year, month):
+        context = self.context(game_name, year, month)
+        scored = [(self.score(c, context), -i, c) for i, c in enumerate(candidates)]
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [(score, c) for score, _, c in scored]
+
+    def select(self, candidates, game_name, year, month):
+        context = self.context(game_name, year, month)
+        best = None
+        best_score = None
+        for candidate in candidates:
+            score = self.score(candidate, context)
+            if best is None or score > best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None, None, False
+        return best, best_score, best_score >= self.min_score
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+
+def get_scorer(config=None):
+    if config is None:
+        from .runtime import runtime_context
+
+        return runtime_context().scorer
+    uploaders = config.get("nyaa_uploaders", DEFAULT_UPLOADERS)
+    min_score = float(config.get("nyaa_min_score", MIN_SCORE))
+    key = (tuple(sorted((str(k), float(v)) for k, v in uploaders.items())), min_score)
+    with _scorers_lock:
+        scorer = _scorers.get(key)
+        if scorer is None:
+            scorer = _scorers[key] = CandidateScorer(uploaders, min_score)
+    return scorer
@@ -1,147 +1,91 @@
-import argparse
-import logging
-import os
-import signal
-import sqlite3
-import sys
-import traceback
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import concurrent.futures as cf
 
 import tool
-from tool.runtime import now_ts, runtime_paths, write_json_atomic
-
-
-_stop_requested = False
-
-
-def _handle_stop(signum, frame):
-    global _stop_requested
-    _stop_requested = True
-
+from tool import db, http_cache
+from tool.runtime import now_ts, runtime_paths
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--start-year", type=int, required=True)
-    parser.add_argument("--end-year", type=int, required=True)
-    args = parser.parse_args()
 
-    paths = runtime_paths()
-    os.makedirs(paths["status_dir"], exist_ok=True)
-    os.makedirs(os.path.dirname(paths["log_path"]) or ".", exist_ok=True)
+def run(job):
+    params = job.params
+    if params.get("no_cache"):
+        http_cache.set_enabled(False)
 
-    logging.basicConfig(
-        filename=paths["log_path"],
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
-
-    signal.signal(signal.SIGTERM, _handle_stop)
-    signal.signal(signal.SIGINT, _handle_stop)
+    config = runtime_paths()["config"]
+    workers = max(1, int(params.get("workers") or config.get("spider_concurrency", 4)))
 
-    start_year = args.start_year
-    end_year = args.end_year
+    start_year = int(params["start_year"])
+    end_year = int(params["end_year"])
     if start_year > end_year:
         start_year, end_year = end_year, start_year
 
-    pid = os.getpid()
-    status = {
-        "running": True,
-        "pid": pid,
-        "progress": 0.0,
-        "current_year": start_year,
-        "current_month": None,
-        "current_game": None,
-        "start_year": start_year,
-        "end_year": end_year,
-        "started_at": now_ts(),
-        "updated_at": now_ts(),
-        "stopped_reason": None,
-    }
-    write_json_atomic(paths["spider_status_path"], status)
+    months = [(year, month) for year in range(start_year, end_year + 1) for month in range(1, 13)]
+    total_months = len(months)
+    completed = job.completed_items()
+    months = [(year, month) for year, month in months if f"{year}-{month:02d}" not in completed]
+    done_months = total_months - len(months)
+
+    status = job.status
+    status.update(
+        {
+            "running": True,
+            "progress": round(done_months / total_months * 100, 2),
+            "current_year": start_year,
+            "current_month": None,
+            "current_game": None,
+            "start_year": start_year,
+            "end_year": end_year,
+            "finished_months": done_months,
+            "failed_months": [],
+            "total_months": total_months,
+            "resumed": bool(completed),
+            "started_at": status.get("started_at") or now_ts(),
+            "stopped_reason": None,
+        }
+    )
+    job.report(status["progress"], force=True)
 
+    conn = db.connect()
+    ex = cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="spider")
     try:
-        total_months = (end_year - start_year + 1) * 12
-        done_months = 0
-
-        conn = sqlite3.connect(paths["db_path"])
-        try:
-            tool.ensure_getchu_schema(conn)
-            cursor = conn.cursor()
-
-            for year in range(start_year, end_year + 1):
-                if _stop_requested:
+        futures = {ex.submit(tool.get_getchu_games, year, month): (year, month) for year, month in months}
+        pending = set(futures)
+        while pending:
+            if job.stop_requested:
+                status["stopped_reason"] = "signal"
+                break
+            done, pending = cf.wait(pending, timeout=0.5, return_when=cf.FIRST_COMPLETED)
+
+            for fut in done:
+                if job.stop_requested:
                     status["stopped_reason"] = "signal"
                     break
 
-                status["current_year"] = year
-                for month in range(1, 13):
-                    if _stop_requested:
-                        status["stopped_reason"] = "signal"
-                        break
-
-                    status["current_month"] = month
-                    status["current_game"] = None
-                    status["current_month_fetched"] = 0
-                    status["current_month_inserted"] = 0
-                    status["current_month_skipped"] = 0
-                    status["updated_at"] = now_ts()
-                    write_json_atomic(paths["spider_status_path"], status)
-
-                    games = tool.get_getchu_games(year, month)
-                    status["current_month_fetched"] = len(games)
-                    status["updated_at"] = now_ts()
-                    write_json_atomic(paths["spider_status_path"], status)
-
-                    inserted = 0
-                    skipped = 0
-
-                    for idx, game in enumerate(games):
-                        if _stop_requested:
-                            status["stopped_reason"] = "signal"
-                            break
-
-                        cursor.execute(
-                            "INSERT OR IGNORE INTO getchu_games (date, name, company) VALUES (?,?,?)",
-                            (game.date, game.name, game.company),
-                        )
-                        if cursor.rowcount == 1:
-                            inserted += 1
-                        else:
-                            skipped += 1
-
-                        if idx % 10 == 0 or idx == len(games) - 1:
-                            status["current_game"] = f"{game.name} ({idx + 1}/{len(games)})"
-                            status["current_month_inserted"] = inserted
-                            status["current_month_skipped"] = skipped
-                            status["updated_at"] = now_ts()
-                            write_json_atomic(paths["spider_status_path"], status)
-
-                    conn.commit()
-
-                    done_months += 1
-                    status["progress"] = round(done_months / total_months * 100, 2)
-                    status["current_month_inserted"] = inserted
-                    status["current_month_skipped"] = skipped
-                    status["updated_at"] = now_ts()
-                    write_json_atomic(paths["spider_status_path"], status)
-
-                if _stop_requested:
-                    break
-        finally:
-            conn.close()
-    except Exception:
-        status["running"] = False
-        status["stopped_reason"] = "error"
-        status["error"] = traceback.format_exc()
-        status["updated_at"] = now_ts()
-        write_json_atomic(paths["spider_status_path"], status)
-        raise
-
-    status["running"] = False
-    status["updated_at"] = now_ts()
-    write_json_atomic(paths["spider_status_path"], status)
+                year, month = futures[fut]
+                games = fut.result()
+                if games is None:
+                    # 抓取失败的月份不记检查点，重试任务时重新抓取
+                    status["failed_months"].append(f"{year}-{month:02d}")
+                    job.report()
+                    continue
 
+                inserted, skipped = tool.bulk_insert_games(conn, games)
+                job.checkpoint(conn, f"{year}-{month:02d}", str(inserted))
+                conn.commit()
 
-if __name__ == "__main__":
-    main()
+                done_months += 1
+                status["finished_months"] = done_months
+                status["current_year"] = year
+                status["current_month"] = month
+                status["current_game"] = games[-1].name if games else None
+                status["current_month_fetched"] = len(games)
+                status["current_month_inserted"] = inserted
+                status["current_month_skipped"] = skipped
+                status["progress"] = round(done_months / total_months * 100, 2)
+                job.report(status["progress"])
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    if status["failed_months"] and not job.stop_requested:
+        status["stopped_reason"] = "fetch_failed"
+        return False
+    return True
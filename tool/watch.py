@@ -0,0 +1,150 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+
+POLL_INTERVAL = 0.25
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._stamp = self._snapshot()
+
+    def _snapshot(self):
+        stamp = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            stamp = self._snapshot()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InotifyWatcher:
+    def __init__(self, paths, libc):
+        self.names = {}
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        try:
+            for path in paths:
+                directory, name = os.path.split(os.path.abspath(path))
+                if directory not in self.names:
+                    wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+                    if wd < 0:
+                        raise OSError(ctypes.get_errno(), f"无法监听目录: {directory}")
+                    self.names[directory] = set()
+                self.names[directory].add(name)
+            self._wanted = set().union(*self.names.values())
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def _drain(self):
+        matched = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return matched
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if os.fsdecode(name) in self._wanted:
+                    matched = True
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if ready and self._drain():
+                return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_libc = None
+
+
+def _inotify_libc():
+    global _libc
+    if _libc is None:
+        _libc = False
+        if hasattr(select, "select") and os.name == "posix":
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1
+                libc.inotify_add_watch
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc
+
+
+def file_watcher(paths):
+    libc = _inotify_libc()
+    if libc:
+        try:
+            return InotifyWatcher(paths, libc)
+        except OSError:
+            pass
+    return PollingWatcher(paths)
+
+
+def db_watcher(db_path):
+    return file_watcher([db_path, db_path + "-wal"])